@@ -0,0 +1,79 @@
+"""
+Compares a connection per request with the pooled PostgreSQL backend.
+
+    $ DATABASE_URL=postgres:///task_manager python -m benchmarks.connections
+
+``benchmarks.load`` runs the short requests, where opening a connection weighs
+the most, and the report task once with ``DB_POOL_MAX_SIZE=0`` and once with
+the pool. Both runs use the same ``--seed``; their results and the change in
+p50 and throughput are written to ``--output``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Requests whose own queries are cheap, so connecting dominates
+SCENARIOS = ["api retrieve", "api complete", "html pending tasks"]
+MODES = {"per request": "0", "pooled": os.environ.get("DB_POOL_MAX_SIZE", "10")}
+
+
+def run(pool_size, args):
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.load",
+            f"--users={args.users}",
+            f"--requests={args.requests}",
+            f"--report-runs={args.report_runs}",
+            f"--seed={args.seed}",
+            f"--output={output.name}",
+        ]
+        command += [f"--scenario={name}" for name in SCENARIOS]
+        env = {**os.environ, "DB_POOL_MAX_SIZE": pool_size}
+        subprocess.run(command, env=env, check=True)
+        return json.load(output)
+
+
+def change(before, after):
+    return round((after - before) / before * 100, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--report-runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-connections.json")
+    args = parser.parse_args()
+    if not os.environ.get("DATABASE_URL", "postgres").startswith("postgres"):
+        parser.error("the pool only applies to PostgreSQL, set DATABASE_URL")
+
+    results = {mode: run(size, args) for mode, size in MODES.items()}
+    baseline = results["per request"]["scenarios"]
+    pooled = results["pooled"]["scenarios"]
+    results["change_percent"] = {
+        name: {
+            "p50_ms": change(baseline[name]["p50_ms"], pooled[name]["p50_ms"]),
+            "throughput_rps": change(
+                baseline[name]["throughput_rps"], pooled[name]["throughput_rps"]
+            ),
+        }
+        for name in baseline
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+        output.write("\n")
+    print(json.dumps(results["change_percent"], indent=2, sort_keys=True))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
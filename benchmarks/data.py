@@ -0,0 +1,131 @@
+"""
+Synthetic, reproducible dataset for the benchmarks.
+
+Tasks per user follow a Pareto distribution: most users have a handful of
+tasks and a few have thousands, like the heavy accounts that make the list
+views slow. Rows are built with the test factories and written with
+``bulk_create``, so generating is fast and no signals fire; the email
+preferences and history the signals would have added are written directly.
+Tasks were created over the last 90 days, their creation dates are set with
+an update after the insert since ``auto_now`` overwrites them.
+"""
+import random
+from datetime import timedelta
+
+import factory.random
+from django.utils import timezone
+
+from task_manager.tasks.models import (
+    STATUS_CHOICES,
+    EmailPreferences,
+    Task,
+    TaskHistory,
+)
+from task_manager.tasks.tests.factories import TaskFactory
+from task_manager.users.tests.factories import UserFactory
+
+# Shape of the long tail, lower means heavier heavy users
+PARETO_ALPHA = 1.2
+MAX_TASKS_PER_USER = 5000
+# Share of tasks that moved through a few statuses and so have history rows
+TASKS_WITH_HISTORY = 0.3
+BATCH_SIZE = 2000
+
+
+def tasks_per_user(rng, users):
+    return [
+        min(int(rng.paretovariate(PARETO_ALPHA)), MAX_TASKS_PER_USER)
+        for _ in range(users)
+    ]
+
+
+def generate(users, seed=0):
+    """Creates ``users`` users with their tasks, history and email preferences.
+
+    The same ``seed`` always produces the same rows. Returns the ids of the
+    users created, heaviest first.
+    """
+    rng = random.Random(seed)
+    factory.random.reseed_random(seed)
+    now = timezone.now()
+    statuses = [status for status, _ in STATUS_CHOICES]
+
+    User = UserFactory._meta.model
+    created_users = []
+    for start in range(0, users, BATCH_SIZE):
+        batch = UserFactory.build_batch(min(BATCH_SIZE, users - start))
+        for index, user in enumerate(batch, start):
+            # Faker user names repeat on large populations
+            user.username = f"{user.username}{index}"
+            user.set_unusable_password()
+        User.objects.bulk_create(batch)
+        # Not every backend hands the primary keys back from bulk_create
+        created_users += User.objects.filter(
+            username__in=[user.username for user in batch]
+        ).order_by("id")
+    EmailPreferences.objects.bulk_create(
+        EmailPreferences(user=user, selected_email_hour=rng.randrange(24))
+        for user in created_users
+    )
+
+    counts = tasks_per_user(rng, users)
+    tasks = []
+    owners = []
+    for user, count in zip(created_users, counts):
+        owners.append(user.pk)
+        for priority in range(1, count + 1):
+            status = rng.choice(statuses)
+            created = now - timedelta(minutes=rng.randrange(60 * 24 * 90))
+            tasks.append(
+                TaskFactory.build(
+                    user=user,
+                    priority=priority,
+                    status=status,
+                    completed=status == "COMPLETED",
+                    created_date=created,
+                    created_at=created,
+                )
+            )
+        if len(tasks) >= BATCH_SIZE:
+            write_tasks(tasks, owners, rng, statuses)
+            tasks, owners = [], []
+    write_tasks(tasks, owners, rng, statuses)
+
+    heaviest_first = sorted(zip(counts, created_users), key=lambda pair: -pair[0])
+    return [user.pk for _, user in heaviest_first]
+
+
+def write_tasks(tasks, owners, rng, statuses):
+    created = [task.created_at for task in tasks]
+    Task.objects.bulk_create(tasks)
+    # Not every backend hands the primary keys back from bulk_create, the
+    # owners' tasks are all in this batch and inserted in order
+    task_ids = list(
+        Task.objects.filter(user_id__in=owners)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    # auto_now and auto_now_add replaced the creation dates, updates keep them
+    for task, task_id, created_at in zip(tasks, task_ids, created):
+        task.pk = task_id
+        task.created_date = task.created_at = created_at
+    Task.objects.bulk_update(
+        tasks, ["created_date", "created_at"], batch_size=BATCH_SIZE
+    )
+
+    history = []
+    for task_id in task_ids:
+        if rng.random() >= TASKS_WITH_HISTORY:
+            continue
+        previous = statuses[0]
+        for current in rng.sample(statuses, rng.randint(1, len(statuses))):
+            if current != previous:
+                history.append(
+                    TaskHistory(
+                        task_id=task_id,
+                        previous_status=previous,
+                        current_status=current,
+                    )
+                )
+                previous = current
+    TaskHistory.objects.bulk_create(history, batch_size=BATCH_SIZE)
@@ -0,0 +1,225 @@
+"""
+Load test of the HTML views, the task API and the report task.
+
+    $ python -m benchmarks.load --users 1000 --requests 200 --output bench.json
+
+A fresh test database is filled by ``benchmarks.data`` from ``--seed``, then
+every scenario is run ``--requests`` times for users drawn from the whole
+population, through the Django test client. The report task runs on a local
+Celery worker with an in-memory broker. Latency percentiles, throughput and
+the time requests kept transactions open are written to ``--output`` as
+sorted JSON, so results of two commits can be compared with a plain diff.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+# What the celery pytest plugin uses, so the worker runs inside this process.
+# Celery reads these from the environment before its configuration.
+os.environ["CELERY_BROKER_URL"] = "memory://"
+os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+django.setup()
+
+from celery.contrib.testing.worker import start_worker  # noqa isort:skip
+from django.contrib.auth.models import User  # noqa isort:skip
+from django.db import close_old_connections, connection  # noqa isort:skip
+from django.test import Client  # noqa isort:skip
+from django.test.utils import (  # noqa isort:skip
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+)
+
+from benchmarks.data import generate  # noqa isort:skip
+from config.celery_app import app  # noqa isort:skip
+from task_manager.tasks.models import EmailPreferences, Task  # noqa isort:skip
+from task_manager.tasks.tasks import check_email_preferences  # noqa isort:skip
+
+
+def task_id(user):
+    return Task.objects.filter(user=user).values_list("id", flat=True).first()
+
+
+# name -> (method, path, payload); paths are formatted with a task of the user
+SCENARIOS = {
+    "html pending tasks": ("get", "/tasks/", None),
+    "html all tasks": ("get", "/all_tasks/", None),
+    "html completed tasks": ("get", "/completed_tasks/", None),
+    "api list": ("get", "/api/task/", None),
+    "api retrieve": ("get", "/api/task/{task}/", None),
+    "api create": (
+        "post",
+        "/api/task/",
+        {"title": "Benchmark task", "description": "Created by the load test"},
+    ),
+    "api update": ("patch", "/api/task/{task}/", {"status": "IN_PROGRESS"}),
+    "api complete": ("post", "/api/task/{task}/complete/", None),
+}
+
+
+class TransactionTimer:
+    """``execute_wrapper`` hook adding up how long transactions stay open, from
+    their first query to their commit: the longest their locks can be held.
+
+    A query run in autocommit is a transaction of its own.
+    """
+
+    def __init__(self):
+        self.duration = 0.0
+        self.started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context["connection"]
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if not connection.in_atomic_block:
+                self.duration += time.perf_counter() - start
+            elif self.started is None:
+                self.started = start
+                connection.on_commit(self.committed)
+
+    def committed(self):
+        self.duration += time.perf_counter() - self.started
+        self.started = None
+
+
+def summarize(timings, elapsed, errors, transaction_timings=None):
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    summary = {
+        "requests": len(timings),
+        "errors": errors,
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "throughput_rps": round(len(timings) / elapsed, 2),
+    }
+    if transaction_timings:
+        cuts = statistics.quantiles(transaction_timings, n=100, method="inclusive")
+        summary["transaction_p50_ms"] = round(cuts[49] * 1000, 3)
+        summary["transaction_p95_ms"] = round(cuts[94] * 1000, 3)
+    return summary
+
+
+def run_scenario(name, user_ids, requests, rng):
+    method, path, payload = SCENARIOS[name]
+    timings = []
+    transaction_timings = []
+    errors = 0
+    elapsed = 0.0
+    for _ in range(requests):
+        user = User.objects.get(pk=rng.choice(user_ids))
+        client = Client()
+        client.force_login(user)
+        request = getattr(client, method)
+        kwargs = {} if payload is None else {"data": payload}
+        if method != "get":
+            kwargs["content_type"] = "application/json"
+        url = path.format(task=task_id(user))
+        # Requests start without the connection the setup above opened, as
+        # behind a WSGI server; the test client never closes connections
+        close_old_connections()
+
+        timer = TransactionTimer()
+        with connection.execute_wrapper(timer):
+            start = time.perf_counter()
+            response = request(url, **kwargs)
+            duration = time.perf_counter() - start
+
+        timings.append(duration)
+        transaction_timings.append(timer.duration)
+        elapsed += duration
+        errors += response.status_code >= 400
+    return summarize(timings, elapsed, errors, transaction_timings)
+
+
+def run_report_task(requests):
+    timings = []
+    elapsed = 0.0
+    with start_worker(app, perform_ping_check=False):
+        for _ in range(requests):
+            # Every user is due, as on the first run of the day
+            EmailPreferences.objects.update(
+                selected_email_hour=0, previous_report_day=0
+            )
+            start = time.perf_counter()
+            check_email_preferences.delay().get(timeout=600)
+            duration = time.perf_counter() - start
+            timings.append(duration)
+            elapsed += duration
+    return summarize(timings, elapsed, 0)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=1000, help="1 to 100000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--report-runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+    if not 1 <= args.users <= 100_000:
+        parser.error("--users must be between 1 and 100000")
+
+    setup_test_environment()
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        start = time.perf_counter()
+        user_ids = generate(args.users, args.seed)
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "users": args.users,
+                "tasks": Task.objects.count(),
+                "seed": args.seed,
+                "requests_per_scenario": args.requests,
+                "generate_seconds": round(time.perf_counter() - start, 2),
+            },
+            "scenarios": {},
+        }
+        rng = random.Random(args.seed)
+        for name in args.scenario or SCENARIOS:
+            results["scenarios"][name] = run_scenario(
+                name, user_ids, args.requests, rng
+            )
+            print(name, results["scenarios"][name])
+        if args.report_runs:
+            results["scenarios"]["celery check_email_preferences"] = run_report_task(
+                args.report_runs
+            )
+    finally:
+        teardown_databases(databases, verbosity=0)
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+        output.write("\n")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
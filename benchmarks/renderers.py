@@ -0,0 +1,92 @@
+"""
+Compares the REST API renderers on a synthetic task list response.
+
+    $ python -m benchmarks.renderers --tasks 10000 --repeat 20
+
+The payload mirrors what ``TaskSerializer(many=True)`` hands to the renderer,
+so no database is needed.
+"""
+import argparse
+import os
+import statistics
+import time
+from collections import OrderedDict
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa isort:skip
+from rest_framework.utils.serializer_helpers import ReturnList  # noqa isort:skip
+
+from task_manager.tasks.models import STATUS_CHOICES  # noqa isort:skip
+from task_manager.tasks.renderers import (  # noqa isort:skip
+    MessagePackRenderer,
+    ORJSONRenderer,
+)
+
+RENDERERS = {
+    "json (stdlib)": JSONRenderer,
+    "json (orjson)": ORJSONRenderer,
+    "msgpack": MessagePackRenderer,
+}
+
+
+def task_list_payload(count):
+    tasks = ReturnList(serializer=None)
+    for index in range(count):
+        tasks.append(
+            OrderedDict(
+                id=index + 1,
+                title=f"TASK NUMBER {index} FOR THE BENCHMARK",
+                description="Lorem ipsum dolor sit amet, consectetur adipiscing elit. "
+                * 3,
+                completed=index % 3 == 0,
+                status=STATUS_CHOICES[index % len(STATUS_CHOICES)][0],
+                priority=index % 50 + 1,
+                user=OrderedDict(
+                    first_name="Ada", last_name="Lovelace", username=f"user{index % 97}"
+                ),
+            )
+        )
+    return {"tasks": tasks}
+
+
+def run(count, repeat):
+    payload = task_list_payload(count)
+    results = {}
+    for name, renderer_class in RENDERERS.items():
+        renderer = renderer_class()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = renderer.render(payload, renderer.media_type, {})
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "median_ms": statistics.median(timings) * 1000,
+            "bytes": len(body),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.tasks, args.repeat)
+    baseline = results["json (stdlib)"]
+    print(f"{args.tasks} tasks, median of {args.repeat} runs")
+    for name, result in results.items():
+        print(
+            f"{name:<15} {result['median_ms']:8.2f} ms "
+            f"({baseline['median_ms'] / result['median_ms']:4.1f}x) "
+            f"{result['bytes']:>10} bytes "
+            f"({result['bytes'] / baseline['bytes']:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
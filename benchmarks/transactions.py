@@ -0,0 +1,80 @@
+"""
+Compares one transaction per request with the per-view transaction policy.
+
+    $ python -m benchmarks.transactions
+
+``benchmarks.load`` runs reads and writes once with ``DATABASE_ATOMIC_REQUESTS``
+turned back on and once with TransactionPolicyMiddleware deciding. Both runs
+use the same ``--seed``; their results and the change in p50 latency,
+throughput and p50 time spent in transactions are written to ``--output``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Reads that no longer open a transaction, and writes with narrower ones
+SCENARIOS = [
+    "html pending tasks",
+    "api list",
+    "api create",
+    "api update",
+    "api complete",
+]
+MODES = {"atomic requests": "True", "per view": "False"}
+COMPARED = ("p50_ms", "throughput_rps", "transaction_p50_ms")
+
+
+def run(atomic_requests, args):
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.load",
+            f"--users={args.users}",
+            f"--requests={args.requests}",
+            "--report-runs=0",
+            f"--seed={args.seed}",
+            f"--output={output.name}",
+        ]
+        command += [f"--scenario={name}" for name in SCENARIOS]
+        env = {**os.environ, "DATABASE_ATOMIC_REQUESTS": atomic_requests}
+        subprocess.run(command, env=env, check=True)
+        return json.load(output)
+
+
+def change(before, after):
+    return round((after - before) / before * 100, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-transactions.json")
+    args = parser.parse_args()
+
+    results = {mode: run(value, args) for mode, value in MODES.items()}
+    baseline = results["atomic requests"]["scenarios"]
+    per_view = results["per view"]["scenarios"]
+    results["change_percent"] = {
+        name: {
+            key: change(baseline[name][key], per_view[name][key]) for key in COMPARED
+        }
+        for name in baseline
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+        output.write("\n")
+    print(json.dumps(results["change_percent"], indent=2, sort_keys=True))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+ASGI config for Task Manager project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Plain HTTP traffic is handed to Django, except for the server-sent events
+stream which is served directly so that idle connections only cost a coroutine.
+Streamed responses, like exports, are read in the thread of their request since
+they run database queries.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+
+"""
+import os
+import sys
+from pathlib import Path
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+# This allows easy placement of apps within the interior
+# task_manager directory.
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR / "task_manager"))
+# If DJANGO_SETTINGS_MODULE is unset, default to the production settings
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """Django 3.2 iterates streamed bodies in the event loop, where database
+    queries are refused: their parts are read with sync_to_async instead.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        # As in ASGIHandler.send_response
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+            if isinstance(value, str):
+                value = value.encode("latin1")
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append(
+                (b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+            )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+        # The thread of the request, which holds its database connection
+        next_part = sync_to_async(next, thread_sensitive=True)
+        parts = iter(response)
+        end = object()
+        while (part := await next_part(parts, end)) is not end:
+            for chunk, _ in self.chunk_bytes(part):
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        await send({"type": "http.response.body"})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+# As get_asgi_application() does, with the handler above
+django.setup(set_prefix=False)
+# This application object is used by any ASGI server configured to use this file.
+django_application = StreamingASGIHandler()
+
+# Import the event stream here, so apps from django_application are loaded first
+from task_manager.tasks.events import EVENTS_PATH, sse_application  # noqa isort:skip
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == EVENTS_PATH:
+        await sse_application(scope, receive, send)
+    elif scope["type"] == "http":
+        await django_application(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        # Nothing to set up or tear down, the server only waits for the answers
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    else:
+        raise NotImplementedError(f"Unknown scope type {scope['type']}")
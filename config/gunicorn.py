@@ -0,0 +1,44 @@
+"""
+Gunicorn settings, used with ``gunicorn -c config/gunicorn.py``.
+
+When PROMETHEUS_MULTIPROC_DIR is set, the workers write their metrics there so
+that /metrics reports the sum over every worker, not just the one it hit. The
+directory is emptied when gunicorn starts, so it must not be shared with the
+Celery workers.
+
+Every worker is warmed up before it accepts requests, see
+``task_manager.tasks.warmup``. With ``--preload`` the master does it once and
+the workers inherit the result when they are forked.
+"""
+import os
+import shutil
+
+multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def on_starting(server):
+    # Samples left by a previous master would be added to the new ones
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from task_manager.tasks.warmup import warm_up
+
+        warm_up()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from task_manager.tasks.warmup import warm_up
+
+        warm_up()
+
+
+def child_exit(server, worker):
+    if multiproc_dir:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
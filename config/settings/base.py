@@ -47,7 +47,29 @@ DATABASES = {
         default="postgres:///task_manager",
     ),
 }
-DATABASES["default"]["ATOMIC_REQUESTS"] = True
+# Views choose their own transactions, see TransactionPolicyMiddleware; True
+# restores one transaction around every view
+DATABASES["default"]["ATOMIC_REQUESTS"] = env.bool(
+    "DATABASE_ATOMIC_REQUESTS", default=False
+)
+# Read-only replicas of the default database, named replica1, replica2...
+for number, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[]), 1):
+    DATABASES[f"replica{number}"] = env.db_url_config(url)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ["task_manager.tasks.routers.ReplicaRouter"]
+# Per-process pool of PostgreSQL connections, see task_manager.tasks.pool.base;
+# a DB_POOL_MAX_SIZE of 0 turns it off
+DB_POOL = {
+    "max_size": env.int("DB_POOL_MAX_SIZE", default=10),
+    "timeout": env.float("DB_POOL_TIMEOUT", default=10.0),
+    "max_lifetime": env.int("DB_POOL_MAX_LIFETIME", default=1800),
+    "ping_after": env.float("DB_POOL_PING_AFTER", default=5.0),
+}
+for database in DATABASES.values():
+    if DB_POOL["max_size"] and database["ENGINE"] == "django.db.backends.postgresql":
+        database["ENGINE"] = "task_manager.tasks.pool"
+        database.setdefault("OPTIONS", {})["pool"] = DB_POOL
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -57,6 +79,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 ROOT_URLCONF = "config.urls"
 # https://docs.djangoproject.com/en/dev/ref/settings/#wsgi-application
 WSGI_APPLICATION = "config.wsgi.application"
+# https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
+ASGI_APPLICATION = "config.asgi.application"
 
 # APPS
 # ------------------------------------------------------------------------------
@@ -137,17 +161,22 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "task_manager.tasks.middleware.RequestProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "task_manager.tasks.middleware.SessionSaveSkipMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "task_manager.tasks.middleware.CachedAuthenticationMiddleware",
+    "task_manager.tasks.middleware.ReplicaRoutingMiddleware",
+    "task_manager.tasks.middleware.SamplingProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.common.BrokenLinkEmailsMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Last, so that its transaction only covers the view
+    "task_manager.tasks.middleware.TransactionPolicyMiddleware",
 ]
 
 # STATIC
@@ -214,6 +243,9 @@ FIXTURE_DIRS = (str(APPS_DIR / "fixtures"),)
 
 # SECURITY
 # ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#session-engine
+# cached_db, read through the default cache and written to django_session
+SESSION_ENGINE = "task_manager.tasks.sessions"
 # https://docs.djangoproject.com/en/dev/ref/settings/#session-cookie-httponly
 SESSION_COOKIE_HTTPONLY = True
 # https://docs.djangoproject.com/en/dev/ref/settings/#csrf-cookie-httponly
@@ -313,12 +345,29 @@ SOCIALACCOUNT_FORMS = {"signup": "task_manager.users.forms.UserSocialSignupForm"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "task_manager.tasks.authentication.CachedTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # orjson is served for application/json, clients may also ask for application/msgpack
+    "DEFAULT_RENDERER_CLASSES": (
+        "task_manager.tasks.renderers.ORJSONRenderer",
+        "task_manager.tasks.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "task_manager.tasks.renderers.ORJSONParser",
+        "task_manager.tasks.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Valid API tokens are remembered this long, saving a query per API request
+API_TOKEN_CACHE_SECONDS = env.int("API_TOKEN_CACHE_SECONDS", default=300)
+# Upper bound on the number of sub-requests a single /api/batch/ call may carry
+API_BATCH_MAX_REQUESTS = env.int("API_BATCH_MAX_REQUESTS", default=20)
+
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
 CORS_URLS_REGEX = r"^/api/.*$"
 
@@ -336,3 +385,34 @@ SPECTACULAR_SETTINGS = {
 }
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Pub/sub channel feeding the server-sent task events stream (see config/asgi.py)
+TASK_EVENTS_CHANNEL = "task_manager.tasks.events.InProcessChannel"
+# Soft-deleted tasks and their history are purged after this many days
+TASK_PURGE_AFTER_DAYS = env.int("TASK_PURGE_AFTER_DAYS", default=30)
+# Rows removed per DELETE statement by the purge job
+TASK_PURGE_BATCH_SIZE = env.int("TASK_PURGE_BATCH_SIZE", default=1000)
+# Completed tasks untouched for this many days are moved to the archive table
+TASK_ARCHIVE_AFTER_DAYS = env.int("TASK_ARCHIVE_AFTER_DAYS", default=90)
+TASK_ARCHIVE_BATCH_SIZE = env.int("TASK_ARCHIVE_BATCH_SIZE", default=1000)
+# Share of requests timed by RequestProfilingMiddleware, 0 turns it off
+REQUEST_PROFILING_SAMPLE_RATE = env.float("REQUEST_PROFILING_SAMPLE_RATE", default=0)
+# Timed requests slower than this are logged by RequestProfilingMiddleware
+SLOW_REQUEST_THRESHOLD_MS = env.int("SLOW_REQUEST_THRESHOLD_MS", default=500)
+# Bearer token required to scrape /metrics, left open when empty
+METRICS_AUTH_TOKEN = env("METRICS_AUTH_TOKEN", default="")
+# Port on which Celery workers serve their metrics, 0 disables it
+CELERY_METRICS_PORT = env.int("CELERY_METRICS_PORT", default=0)
+# Authenticated users are loaded from the cache, kept there this long
+AUTH_USER_CACHE_SECONDS = env.int("AUTH_USER_CACHE_SECONDS", default=300)
+# Per-user task counts shown by the task lists, dropped whenever tasks change
+TASK_COUNTS_CACHE_SECONDS = env.int("TASK_COUNTS_CACHE_SECONDS", default=3600)
+# TaskHistory rows are folded into the rollup once this old, by when every
+# transaction that took a lower id has committed
+TASK_STATS_LAG_SECONDS = env.int("TASK_STATS_LAG_SECONDS", default=60)
+# How long each process trusts its copy of a user's cache version, and so how
+# long other processes may serve per-user data from before a change
+USER_VERSION_LOCAL_SECONDS = env.int("USER_VERSION_LOCAL_SECONDS", default=1)
+# Users who wrote something read from the primary database for this long
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=10)
+# Expired django_session rows removed per DELETE by clear_expired_sessions
+SESSION_CLEANUP_BATCH_SIZE = env.int("SESSION_CLEANUP_BATCH_SIZE", default=1000)
@@ -11,13 +11,31 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["example.com"])
 # DATABASES
 # ------------------------------------------------------------------------------
 DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
-DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
-DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
+DATABASES["default"]["ATOMIC_REQUESTS"] = env.bool(  # noqa F405
+    "DATABASE_ATOMIC_REQUESTS", default=False
+)
+if DB_POOL["max_size"]:  # noqa F405
+    # Closed at the end of each request or task, which returns it to the pool
+    DATABASES["default"]["ENGINE"] = "task_manager.tasks.pool"  # noqa F405
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = DB_POOL  # noqa F405
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = env.int(  # noqa F405
+        "CONN_MAX_AGE", default=60
+    )
 
 # CACHES
 # ------------------------------------------------------------------------------
 CACHES = {
+    # Hot values are served from each process, see task_manager.tasks.cache
     "default": {
+        "BACKEND": "task_manager.tasks.cache.TwoTierCache",
+        "LOCATION": "redis",
+        "OPTIONS": {
+            "LOCAL_TIMEOUT": env.int("CACHE_LOCAL_TIMEOUT", default=5),
+            "MAX_ENTRIES": env.int("CACHE_LOCAL_MAX_ENTRIES", default=1000),
+        },
+    },
+    "redis": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": env("REDIS_URL"),
         "OPTIONS": {
@@ -26,9 +44,12 @@ CACHES = {
             # https://github.com/jazzband/django-redis#memcached-exceptions-behavior
             "IGNORE_EXCEPTIONS": True,
         },
-    }
+    },
 }
 
+# Sessions must be current in every process, so they skip the local tier
+SESSION_CACHE_ALIAS = "redis"
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#secure-proxy-ssl-header
@@ -60,6 +81,22 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # MEDIA
 # ------------------------------------------------------------------------------
 
+# TEMPLATES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#templates
+# Compiled templates are kept for the life of the process, and the gunicorn
+# workers compile them all before their first request, see config/gunicorn.py
+TEMPLATES[-1]["APP_DIRS"] = False  # noqa F405
+TEMPLATES[-1]["OPTIONS"]["loaders"] = [  # noqa F405
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    )
+]
+
 # EMAIL
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#default-from-email
@@ -142,3 +179,8 @@ LOGGING = {
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Task events have to reach streams held open by other workers
+TASK_EVENTS_CHANNEL = "task_manager.tasks.events.RedisChannel"
+TASK_EVENTS_REDIS_URL = env("REDIS_URL")
+# /metrics is reachable from the internet, scrapers must present this token
+METRICS_AUTH_TOKEN = env("METRICS_AUTH_TOKEN")
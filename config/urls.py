@@ -20,12 +20,22 @@ from task_manager.tasks.views import (
     GenericMarkTaskAsCompleteView,
     GenericAllTaskView,
     GenericEmailPreferencesUpdateView,
+    metrics_view,
 )
 from django.contrib.auth.views import LogoutView
 
 from django.views.generic import RedirectView
 from rest_framework.routers import SimpleRouter
-from task_manager.tasks.apiviews import TaskListAPI, TaskViewSet, TaskHistoryViewSet
+from task_manager.tasks.apiviews import (
+    BatchAPIView,
+    MultiTaskHistoryAPI,
+    TaskExportAPI,
+    TaskImportAPI,
+    TaskStatsAPI,
+    TaskListAPI,
+    TaskViewSet,
+    TaskHistoryViewSet,
+)
 
 router = SimpleRouter()
 router.register("api/task", TaskViewSet)
@@ -59,8 +69,14 @@ urlpatterns = (
         path("user/logout/", LogoutView.as_view()),
         path("sessiontest/", session_storage_view),
         path("taskapi/", TaskListAPI.as_view()),
+        path("api/task/history/", MultiTaskHistoryAPI.as_view()),
         path("api/task/history/<id>/", TaskHistoryViewSet.as_view({"get": "list"})),
+        path("api/batch/", BatchAPIView.as_view()),
+        path("api/task/export/", TaskExportAPI.as_view()),
+        path("api/task/import/", TaskImportAPI.as_view()),
+        path("api/task/stats/", TaskStatsAPI.as_view()),
         path("update-email-pref/<pk>", GenericEmailPreferencesUpdateView.as_view()),
+        path("metrics", metrics_view, name="metrics"),
     ]
     + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     + router.urls
@@ -1,6 +1,7 @@
 import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
 
-from task_manager.users.models import User
 from task_manager.users.tests.factories import UserFactory
 
 
@@ -9,6 +10,12 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Ids are reused across tests on some databases, cached rows must not be
+    cache.clear()
+
+
 @pytest.fixture
 def user() -> User:
     return UserFactory()
@@ -1,8 +1,19 @@
 from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
 # Register your models here.
 
-from task_manager.tasks.models import Task, TaskHistory, EmailPreferences
+from task_manager.tasks.models import (
+    Task,
+    TaskHistory,
+    EmailPreferences,
+    TaskDailyStats,
+    ProfilingConfig,
+    RequestProfile,
+)
 
 admin.sites.site.register(Task)
 
@@ -14,3 +25,58 @@ class TaskHistoryAdmin(admin.ModelAdmin):
 admin.sites.site.register(TaskHistory, TaskHistoryAdmin)
 
 admin.sites.site.register(EmailPreferences)
+
+admin.sites.site.register(TaskDailyStats)
+
+admin.sites.site.register(ProfilingConfig)
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "user",
+        "status_code",
+        "duration_ms",
+        "download",
+    )
+    list_filter = ("method", "status_code")
+    search_fields = ("path",)
+    readonly_fields = (
+        "method",
+        "path",
+        "user",
+        "status_code",
+        "duration_ms",
+        "created_at",
+        "download",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="tasks_requestprofile_download",
+            )
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.data), "application/octet-stream")
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="request-{profile.pk}.prof"'
+        return response
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        url = reverse("admin:tasks_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">Download .prof</a>', url)
+
+
+admin.sites.site.register(RequestProfile, RequestProfileAdmin)
@@ -1,20 +1,49 @@
+import copy
+import csv
+import io
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, QueryDict, StreamingHttpResponse
+from django.urls import Resolver404, resolve
 from django_filters.rest_framework import (
+    BaseInFilter,
     CharFilter,
     ChoiceFilter,
     DjangoFilterBackend,
     FilterSet,
     BooleanFilter,
     IsoDateTimeFilter,
+    NumberFilter,
 )
 
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import (
+    BooleanField,
+    CharField,
+    ChoiceField,
+    IntegerField,
+    ListField,
+    ModelSerializer,
+    Serializer,
+)
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from task_manager.tasks.models import Task, TaskHistory
+from task_manager.tasks.exports import EXPORT_FIELDS, EXPORT_FORMATS, export_chunks
+from task_manager.tasks.imports import TaskImporter
+from task_manager.tasks.models import ArchivedTask, Task, TaskHistory
+from task_manager.tasks.stats import task_stats
+from task_manager.tasks.transactions import ScopedWritesMixin, read_only_requests
 
 STATUS_CHOICES = (
     ("PENDING", "PENDING"),
@@ -41,10 +70,66 @@ class TaskSerializer(ModelSerializer):
 
     class Meta:
         model = Task
-        fields = ["id", "title", "description", "completed", "status", "user"]
+        fields = [
+            "id",
+            "title",
+            "description",
+            "completed",
+            "status",
+            "priority",
+            "user",
+        ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Drop everything the client did not ask for (see SparseFieldsetMixin)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class SparseFieldsetMixin:
+    """Narrows task responses with ``?fields=id,title`` and ``?expand=user``.
+
+    Without either parameter every field is returned, including the nested user.
+    The same selection is used to trim the SQL column list, so unused columns
+    (``description`` in particular) are never read from the database.
+    """
+
+    def get_sparse_fields(self):
+        query_params = self.request.query_params
+        requested = query_params.get("fields")
+        expand = query_params.get("expand", "").split(",")
+
+        if not requested:
+            return list(TaskSerializer.Meta.fields)
+
+        requested = [name.strip() for name in requested.split(",") if name.strip()]
+        unknown = set(requested) - set(TaskSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError(
+                {"fields": [f"Unknown field(s): {', '.join(sorted(unknown))}"]}
+            )
+        if "user" in expand:
+            requested.append("user")
+        return [name for name in TaskSerializer.Meta.fields if name in requested]
+
+    def narrow_queryset(self, queryset, fields):
+        columns = [name for name in fields if name != "user"]
+        if "user" in fields:
+            return queryset.select_related("user").only(
+                *columns,
+                "user",
+                *(f"user__{name}" for name in UserSerializer.Meta.fields),
+            )
+        return queryset.only(*columns)
+
+
+class BulkCompleteSerializer(Serializer):
+    ids = ListField(child=IntegerField(), allow_empty=False, max_length=1000)
 
 
-class TaskViewSet(ModelViewSet):
+class TaskViewSet(ScopedWritesMixin, SparseFieldsetMixin, ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
 
@@ -54,16 +139,66 @@ class TaskViewSet(ModelViewSet):
     filterset_class = TaskFilter
 
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user, deleted=False)
+        tasks = Task.objects.filter(user=self.request.user, deleted=False)
+        # Writes go through get_object() and need the full row
+        if self.action in ("list", "retrieve"):
+            tasks = self.narrow_queryset(tasks, self.get_sparse_fields())
+        return tasks
 
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve"):
+            kwargs.setdefault("fields", self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("include_archived") not in ("1", "true"):
+            return super().list(request, *args, **kwargs)
+
+        # Archived tasks share the task columns, so filters and serializer apply as is
+        archived = self.filter_queryset(
+            self.narrow_queryset(
+                ArchivedTask.objects.filter(user=request.user),
+                self.get_sparse_fields(),
+            )
+        )
+        tasks = [*self.filter_queryset(self.get_queryset()), *archived]
+        return Response(self.get_serializer(tasks, many=True).data)
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        completed = self.get_queryset().filter(pk=pk).complete()
+        if not completed and not self.get_queryset().filter(pk=pk).exists():
+            raise Http404
+        return Response({"completed": completed})
+
+    @action(detail=False, methods=["post"], url_path="complete")
+    def bulk_complete(self, request):
+        serializer = BulkCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        completed = (
+            self.get_queryset()
+            .filter(id__in=serializer.validated_data["ids"])
+            .complete()
+        )
+        return Response({"completed": completed})
+
+    def perform_destroy(self, instance):
+        Task.objects.filter(pk=instance.pk).soft_delete()
+
 
-class TaskListAPI(APIView):
+class TaskListAPI(SparseFieldsetMixin, APIView):
     def get(self, request):
-        tasks = Task.objects.filter(deleted=False)
-        data = TaskSerializer(tasks, many=True).data
+        fields = self.get_sparse_fields()
+        tasks = self.narrow_queryset(Task.objects.filter(deleted=False), fields)
+        data = TaskSerializer(tasks, many=True, fields=fields).data
         return Response({"tasks": data})
 
 
@@ -93,3 +228,244 @@ class TaskHistoryViewSet(ReadOnlyModelViewSet):
         return TaskHistory.objects.filter(
             task=task_id, task__deleted=False, task__user=self.request.user
         )
+
+
+class NumberInFilter(BaseInFilter, NumberFilter):
+    pass
+
+
+class MultiTaskHistoryFilter(TaskHistoryFilter):
+    task = NumberInFilter(field_name="task_id")
+    updated_after = IsoDateTimeFilter(field_name="updated_at", lookup_expr="gte")
+    updated_before = IsoDateTimeFilter(field_name="updated_at", lookup_expr="lt")
+
+
+class MultiTaskHistorySerializer(ModelSerializer):
+    class Meta:
+        model = TaskHistory
+        fields = ["id", "task", "previous_status", "current_status", "updated_at"]
+
+
+class TaskHistoryCursorPagination(CursorPagination):
+    ordering = ("-updated_at", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class MultiTaskHistoryAPI(ListAPIView):
+    """History of many tasks at once, e.g. ``?task=1,2,3`` and/or a date range.
+
+    Ownership is checked in the same query that reads the history, and each page
+    is grouped by task.
+    """
+
+    serializer_class = MultiTaskHistorySerializer
+    pagination_class = TaskHistoryCursorPagination
+
+    permission_classes = (IsAuthenticated,)
+
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = MultiTaskHistoryFilter
+
+    def get_queryset(self):
+        return TaskHistory.objects.filter(
+            task__user=self.request.user, task__deleted=False
+        )
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+
+        groups = {}
+        for entry in self.get_serializer(page, many=True).data:
+            groups.setdefault(entry.pop("task"), []).append(entry)
+
+        return self.get_paginated_response(
+            [
+                {"task": task_id, "history": history}
+                for task_id, history in groups.items()
+            ]
+        )
+
+
+class TaskStatsSerializer(Serializer):
+    days = IntegerField(min_value=1, max_value=366, default=30)
+
+
+class TaskStatsAPI(APIView):
+    """Status counts, completions per day and average time spent in each status.
+
+    Day based figures come from the TaskDailyStats rollup, so they trail history
+    by at most one run of ``refresh_task_stats``.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        serializer = TaskStatsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(task_stats(request.user, serializer.validated_data["days"]))
+
+
+class ExportSerializer(Serializer):
+    resource = ChoiceField(choices=list(EXPORT_FIELDS), default="tasks")
+    # Not called "format" as DRF reserves that query parameter for renderers
+    output = ChoiceField(choices=EXPORT_FORMATS, default="csv")
+    gzip = BooleanField(default=False)
+    # Staff only: export every user's rows instead of just their own
+    all_users = BooleanField(default=False)
+
+
+class TaskExportAPI(APIView):
+    """Streams tasks or history as CSV/NDJSON, optionally gzipped on the fly."""
+
+    permission_classes = (IsAuthenticated,)
+    # A streamed body cannot be embedded in a batch response
+    batchable = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # The body is produced after the view returns, outside of ATOMIC_REQUESTS
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
+
+    def get(self, request):
+        serializer = ExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        options = serializer.validated_data
+
+        user = request.user
+        if options["all_users"]:
+            if not user.is_staff:
+                raise PermissionDenied
+            user = None
+
+        filename = f"{options['resource']}.{options['output']}"
+        content_type = (
+            "text/csv" if options["output"] == "csv" else "application/x-ndjson"
+        )
+        if options["gzip"]:
+            filename += ".gz"
+            content_type = "application/gzip"
+
+        response = StreamingHttpResponse(
+            export_chunks(
+                options["resource"], options["output"], user, options["gzip"]
+            ),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TaskImportAPI(ScopedWritesMixin, APIView):
+    """Bulk-creates the user's tasks from a JSON list or an uploaded CSV ``file``.
+
+    Nothing is imported unless every row is valid, the rows are parsed and
+    validated outside of the import's transaction.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        if "file" in request.FILES:
+            rows = csv.DictReader(
+                io.TextIOWrapper(request.FILES["file"], encoding="utf-8")
+            )
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            raise ValidationError(
+                {"detail": "Expected a list of tasks or a CSV upload named file."}
+            )
+
+        importer = TaskImporter(user=request.user).run(rows)
+        if importer.invalid_rows:
+            return Response(
+                {"invalid_rows": importer.invalid_rows, "errors": importer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"imported": importer.imported}, status=status.HTTP_201_CREATED)
+
+
+class BatchRequestSerializer(Serializer):
+    # Only reads are batched, so everything can share one read-only transaction
+    method = ChoiceField(choices=["GET"], default="GET")
+    path = CharField()
+
+
+class BatchSerializer(Serializer):
+    requests = ListField(
+        child=BatchRequestSerializer(),
+        allow_empty=False,
+        max_length=settings.API_BATCH_MAX_REQUESTS,
+    )
+
+
+class BatchAPIView(APIView):
+    """Runs several GET sub-requests in-process and returns all of their results.
+
+    The batch is authenticated once and every sub-request reuses that identity,
+    skipping middleware, and all of them read from a single transaction. Only
+    DRF views can be batched, others render templates or change state, and
+    views setting ``batchable = False`` are left out too.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    batchable = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Every sub-request reads from the same snapshot
+        return read_only_requests(
+            super().as_view(**initkwargs), isolation="REPEATABLE READ"
+        )
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = [
+            self.run_sub_request(request, sub_request)
+            for sub_request in serializer.validated_data["requests"]
+        ]
+        return Response({"responses": responses})
+
+    def run_sub_request(self, request, sub_request):
+        url = urlsplit(sub_request["path"])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {"status": 404, "body": {"detail": "Not found."}}
+        view_class = getattr(match.func, "cls", None)
+        if view_class is BatchAPIView:
+            return {"status": 400, "body": {"detail": "Batches cannot be nested."}}
+        if not (
+            isinstance(view_class, type)
+            and issubclass(view_class, APIView)
+            and getattr(view_class, "batchable", True)
+        ):
+            return {"status": 400, "body": {"detail": "This path cannot be batched."}}
+
+        http_request = copy.copy(request._request)
+        http_request.method = sub_request["method"]
+        http_request.path = http_request.path_info = url.path
+        http_request.META = {
+            **request._request.META,
+            "REQUEST_METHOD": sub_request["method"],
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+        }
+        http_request.GET = QueryDict(url.query)
+        http_request.POST = QueryDict()
+        http_request.resolver_match = match
+        # DRF views skip their authentication classes for forced credentials
+        http_request._force_auth_user = request.user
+        http_request._force_auth_token = request.auth
+
+        try:
+            response = match.func(http_request, *match.args, **match.kwargs)
+        except Http404:
+            return {"status": 404, "body": {"detail": "Not found."}}
+        except PermissionDenied:
+            return {"status": 403, "body": {"detail": "Permission denied."}}
+
+        return {"status": response.status_code, "body": response.data}
@@ -7,3 +7,6 @@ class TasksConfig(AppConfig):
 
     def ready(self):
         import task_manager.tasks.signals
+
+        # Connects the Celery hooks before a worker runs its first task
+        import task_manager.tasks.routers
@@ -0,0 +1,126 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    _get_user_session_key,
+    get_user,
+)
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from task_manager.tasks.cache import (
+    bump_user_version,
+    local_cache,
+    shared_cache,
+    user_key,
+)
+from task_manager.tasks.metrics import CACHE_REQUESTS
+
+
+def token_cache_key(key):
+    # Hashed so that the cache never holds usable credentials
+    return "auth-token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_user_tokens(user_id):
+    keys = Token.objects.filter(user_id=user_id).values_list("key", flat=True)
+    shared_cache().delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication remembering valid tokens for API_TOKEN_CACHE_SECONDS.
+
+    Only the id of their user is cached, the user is then loaded through
+    ``load_user``. Entries are dropped when their token is deleted or its user
+    is saved, which includes deactivating them, see
+    ``task_manager.tasks.signals``. They skip the local tier of the cache so
+    that every process sees them go at once.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user_id = shared_cache().get(cache_key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            shared_cache().set(cache_key, user.pk, settings.API_TOKEN_CACHE_SECONDS)
+            return user, token
+
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return user, Token(key=key, user=user)
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def forget_user(user_id):
+    shared_cache().delete(user_cache_key(user_id))
+    local = local_cache()
+    if local is not None:
+        local.delete(user_key(user_id, "auth-user"))
+    # Other processes drop their local copy with the version
+    bump_user_version(user_id)
+
+
+def load_user(user_id):
+    """The active user ``user_id``, from the cache or else the database.
+
+    Returns None for unknown or inactive users, like ``ModelBackend.get_user``.
+    Each process also keeps the users it loaded in the local tier, under their
+    ``user_key()``: a deactivated user or a changed password is seen by every
+    process within USER_VERSION_LOCAL_SECONDS.
+    """
+    local = local_cache()
+    if local is not None:
+        local_key = user_key(user_id, "auth-user")
+        user = local.get(local_key)
+        if user is not None:
+            CACHE_REQUESTS.labels("local_hit").inc()
+            return user
+
+    cache = shared_cache()
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User._default_manager.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            return None
+        cache.set(key, user, settings.AUTH_USER_CACHE_SECONDS)
+    if local is not None:
+        local.set(local_key, user)
+    return user
+
+
+def get_cached_user(request):
+    """``django.contrib.auth.get_user`` loading the user through ``load_user``.
+
+    The session is verified against the auth hash of the cached user, so a
+    password change, which saves the user and so drops them from the cache,
+    still logs out the other sessions.
+    """
+    try:
+        user_id = _get_user_session_key(request)
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    user = load_user(user_id)
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if (
+        user is not None
+        and session_hash
+        and constant_time_compare(session_hash, user.get_session_auth_hash())
+    ):
+        return user
+    # Unverified sessions take Django's path, which also flushes them
+    return get_user(request)
@@ -0,0 +1,188 @@
+"""
+Cache backend keeping recently used entries in process, in front of a shared cache.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "task_manager.tasks.cache.TwoTierCache",
+            "LOCATION": "redis",
+            "OPTIONS": {"LOCAL_TIMEOUT": 5, "MAX_ENTRIES": 1000},
+        },
+        "redis": {...},
+    }
+
+LOCATION names the shared cache. Each process keeps up to MAX_ENTRIES of the
+values it read or wrote, least recently used first out, for LOCAL_TIMEOUT
+seconds at most: that is how long a change made by another process can go
+unnoticed. Per-user data is stored under ``user_key()``, whose version each
+process rechecks in the shared cache every USER_VERSION_LOCAL_SECONDS (1 by
+default) instead: other processes see a change that much later at most, and
+a hot value costs no round trip in between.
+"""
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from task_manager.tasks.metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = location
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        # LocMemCache instances of the same name share their storage, so every
+        # thread of the process sees the same local tier
+        self.local = LocMemCache(
+            f"two-tier:{location}",
+            {
+                "TIMEOUT": self.local_timeout,
+                "OPTIONS": {"MAX_ENTRIES": options.get("MAX_ENTRIES", 1000)},
+            },
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def get_local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _MISSING, version)
+        if value is not _MISSING:
+            CACHE_REQUESTS.labels("local_hit").inc()
+            return value
+        value = self.shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            CACHE_REQUESTS.labels("miss").inc()
+            return default
+        CACHE_REQUESTS.labels("shared_hit").inc()
+        self.local.set(key, value, self.local_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self.local.get_many(keys, version)
+        CACHE_REQUESTS.labels("local_hit").inc(len(found))
+        remaining = [key for key in keys if key not in found]
+        if remaining:
+            shared = self.shared.get_many(remaining, version)
+            CACHE_REQUESTS.labels("shared_hit").inc(len(shared))
+            CACHE_REQUESTS.labels("miss").inc(len(remaining) - len(shared))
+            self.local.set_many(shared, self.local_timeout, version)
+            found.update(shared)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.local.has_key(key, version) or self.shared.has_key(key, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self.local.set(key, value, self.get_local_timeout(timeout), version)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self.local.set(key, value, self.get_local_timeout(timeout), version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self.local.set_many(
+            {key: value for key, value in data.items() if key not in failed},
+            self.get_local_timeout(timeout),
+            version,
+        )
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        self.local.set(key, value, self.local_timeout, version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version)
+        return self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self.local.delete_many(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+def shared_cache():
+    """The default cache without its in-process tier, if it has one."""
+    return getattr(caches["default"], "shared", cache)
+
+
+def user_version_key(user_id):
+    return f"user-version:{user_id}"
+
+
+def local_cache():
+    """The in-process tier of the default cache, None if it has none."""
+    return getattr(caches["default"], "local", None)
+
+
+def user_version(user_id):
+    key = user_version_key(user_id)
+    local = local_cache()
+    if local is not None:
+        version = local.get(key)
+        if version is not None:
+            CACHE_REQUESTS.labels("local_hit").inc()
+            return version
+    # Starting from the clock, a version lost to eviction is never handed out again
+    version = shared_cache().get_or_set(key, time.time_ns, None)
+    if local is not None:
+        local.set(key, version, settings.USER_VERSION_LOCAL_SECONDS)
+    return version
+
+
+def bump_user_version(*user_ids):
+    """Invalidates everything cached under ``user_key()`` for these users once
+    the current transaction commits, so that nothing older is cached again.
+    """
+    transaction.on_commit(partial(_bump_user_versions, set(user_ids)))
+
+
+def _bump_user_versions(user_ids):
+    shared = shared_cache()
+    local = local_cache()
+    for user_id in user_ids:
+        key = user_version_key(user_id)
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.set(key, time.time_ns(), None)
+        # This process sees its own changes at once
+        if local is not None:
+            local.delete(key)
+
+
+def user_key(user_id, name):
+    """Key of per-user data, changed for every process by ``bump_user_version()``
+    within USER_VERSION_LOCAL_SECONDS.
+    """
+    return f"{name}:{user_id}:{user_version(user_id)}"
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from functools import lru_cache
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.http.cookie import parse_cookie
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+# Served straight from config.asgi, outside of the Django request cycle
+EVENTS_PATH = "/api/task/events/"
+# Idle streams get a comment line this often so proxies don't drop them
+KEEPALIVE_SECONDS = 15
+# Wait before the pub/sub reader reconnects to Redis
+REDIS_RETRY_SECONDS = 1
+
+
+class Subscription:
+    """A per-connection queue that channels push events into from any thread."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessChannel:
+    """Delivers events to subscribers of the current process only.
+
+    Good enough for tests and ``runserver``, where publisher and stream share a process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+
+class RedisChannel:
+    """Fans events out across web processes through Redis pub/sub.
+
+    Each process has one reader thread, started with its first stream, holding
+    one pub/sub connection subscribed to the events of every user. It hands
+    them to the streams of the process through an InProcessChannel, so a
+    stream costs a queue rather than a thread and a Redis connection.
+    """
+
+    def __init__(self):
+        import redis
+
+        self._client = redis.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+        self._local = InProcessChannel()
+        self._lock = threading.Lock()
+        self._reader = None
+
+    @staticmethod
+    def channel_name(user_id):
+        return f"task_manager:task-events:{user_id}"
+
+    def publish(self, user_id, event):
+        self._client.publish(
+            self.channel_name(user_id), json.dumps(event, cls=DjangoJSONEncoder)
+        )
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._reader is None:
+                # redis-py's pubsub is blocking, hence the thread
+                self._reader = threading.Thread(target=self._read, daemon=True)
+                self._reader.start()
+        return self._local.subscribe(user_id)
+
+    def unsubscribe(self, subscription):
+        self._local.unsubscribe(subscription)
+
+    def _read(self):
+        import redis
+
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.channel_name("*"))
+                for message in pubsub.listen():
+                    user_id = int(message["channel"].rsplit(b":", 1)[1])
+                    self._local.publish(user_id, json.loads(message["data"]))
+            except redis.ConnectionError:
+                logger.exception("Lost the task events connection to Redis")
+            finally:
+                pubsub.close()
+            time.sleep(REDIS_RETRY_SECONDS)
+
+
+@lru_cache(maxsize=None)
+def get_channel():
+    return import_string(settings.TASK_EVENTS_CHANNEL)()
+
+
+def publish_event(user_id, event):
+    # Only announce changes once they are visible to clients re-fetching them
+    if user_id is not None:
+        transaction.on_commit(lambda: get_channel().publish(user_id, event))
+
+
+def format_event(event):
+    data = json.dumps(event, cls=DjangoJSONEncoder)
+    return f"event: {event['type']}\ndata: {data}\n\n".encode()
+
+
+@sync_to_async
+def authenticate(scope):
+    # Imported lazily as the app registry is not ready when config.asgi imports us
+    from task_manager.tasks.authentication import (
+        CachedTokenAuthentication,
+        get_cached_user,
+    )
+
+    headers = dict(scope["headers"])
+    try:
+        authorization = headers.get(b"authorization", b"").decode("latin-1").split()
+        if len(authorization) == 2 and authorization[0] == "Token":
+            try:
+                user, _ = CachedTokenAuthentication().authenticate_credentials(
+                    authorization[1]
+                )
+            except AuthenticationFailed:
+                return None
+            return user
+
+        cookies = parse_cookie(headers.get(b"cookie", b"").decode("latin-1"))
+        session_key = cookies.get(settings.SESSION_COOKIE_NAME)
+        if not session_key:
+            return None
+        engine = import_module(settings.SESSION_ENGINE)
+        user = get_cached_user(
+            SimpleNamespace(session=engine.SessionStore(session_key))
+        )
+        return user if user.is_authenticated else None
+    finally:
+        close_old_connections()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def sse_application(scope, receive, send):
+    user = await authenticate(scope)
+    if user is None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 401,
+                "headers": [(b"content-type", b"text/plain")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b"Unauthorized"})
+        return
+
+    channel = get_channel()
+    subscription = channel.subscribe(user.pk)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    next_event = None
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b": connected\n\n",
+                "more_body": True,
+            }
+        )
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {next_event, disconnect},
+                timeout=KEEPALIVE_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                break
+            if next_event in done:
+                body = format_event(next_event.result())
+                next_event = None
+            else:
+                body = b": keepalive\n\n"
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+    finally:
+        channel.unsubscribe(subscription)
+        for pending in (next_event, disconnect):
+            if pending is not None:
+                pending.cancel()
@@ -0,0 +1,93 @@
+import csv
+import io
+import zlib
+
+import orjson
+
+from task_manager.tasks.models import Task, TaskHistory
+
+EXPORT_FIELDS = {
+    "tasks": (
+        "id",
+        "user_id",
+        "title",
+        "description",
+        "completed",
+        "deleted",
+        "status",
+        "priority",
+        "created_date",
+    ),
+    "history": (
+        "id",
+        "task_id",
+        "previous_status",
+        "current_status",
+        "updated_at",
+    ),
+}
+EXPORT_FORMATS = ("csv", "ndjson")
+
+# Rows fetched per round trip of the server-side cursor
+CHUNK_SIZE = 2000
+# Rows are buffered into chunks of roughly this many bytes before being yielded
+BUFFER_SIZE = 64 * 1024
+
+
+def export_queryset(resource, user=None):
+    if resource == "tasks":
+        rows = Task.objects.all()
+        if user is not None:
+            rows = rows.filter(user=user)
+    else:
+        rows = TaskHistory.objects.all()
+        if user is not None:
+            rows = rows.filter(task__user=user)
+    # values() skips model instantiation, iterator() streams from a server-side cursor
+    return (
+        rows.order_by("id")
+        .values_list(*EXPORT_FIELDS[resource])
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def csv_chunks(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(fields, rows):
+    buffer = bytearray()
+    for row in rows:
+        buffer += orjson.dumps(dict(zip(fields, row)))
+        buffer += b"\n"
+        if len(buffer) >= BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    yield bytes(buffer)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(resource, export_format, user=None, compress=False):
+    """Yields the encoded export of ``resource`` without holding it in memory."""
+    fields = EXPORT_FIELDS[resource]
+    rows = export_queryset(resource, user)
+    encode = csv_chunks if export_format == "csv" else ndjson_chunks
+    chunks = encode(fields, rows)
+    return gzip_chunks(chunks) if compress else chunks
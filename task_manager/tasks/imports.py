@@ -0,0 +1,164 @@
+import csv
+import io
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.serializers import ModelSerializer
+
+from task_manager.tasks.cache import bump_user_version
+from task_manager.tasks.models import EmailPreferences, Task
+
+# Columns written by COPY, everything else keeps its database default
+COPY_COLUMNS = (
+    "title",
+    "description",
+    "completed",
+    "created_date",
+    "created_at",
+    "deleted",
+    "user_id",
+    "priority",
+    "status",
+)
+# Only the first few problems are reported back, the import is rolled back anyway
+MAX_REPORTED_ERRORS = 100
+
+
+class TaskImportSerializer(ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ["title", "description", "priority", "status", "completed"]
+
+
+def batched(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def copy_tasks(tasks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for task in tasks:
+        writer.writerow([getattr(task, column) for column in COPY_COLUMNS])
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {Task._meta.db_table} ({', '.join(COPY_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+class TaskImporter:
+    """Validates and loads task rows in batches inside one transaction.
+
+    Rows are dicts with the fields of ``TaskImportSerializer`` plus ``username``
+    when no ``user`` is given. Pending tasks are appended after the owner's
+    existing pending tasks in file order, so nothing has to be re-prioritised.
+    Any invalid row rolls the whole import back.
+    """
+
+    def __init__(self, user=None, batch_size=5000):
+        self.user = user
+        self.batch_size = batch_size
+        self.imported = 0
+        self.invalid_rows = 0
+        self.errors = []
+        self.users = {}
+        self.next_priority = {}
+
+    def run(self, rows):
+        with transaction.atomic():
+            for index, batch in enumerate(batched(rows, self.batch_size)):
+                tasks = self.validate(batch, index * self.batch_size)
+                # Keep validating after the first error so everything gets reported
+                if not self.invalid_rows:
+                    self.load(tasks)
+            if self.invalid_rows:
+                transaction.set_rollback(True)
+                self.imported = 0
+        return self
+
+    def report_error(self, row_number, errors):
+        self.invalid_rows += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    def resolve_users(self, batch):
+        if self.user is not None:
+            return
+        usernames = {row.get("username") for row in batch} - set(self.users)
+        if usernames:
+            self.users.update(
+                User.objects.filter(username__in=usernames).in_bulk(
+                    field_name="username"
+                )
+            )
+
+    def validate(self, batch, offset):
+        self.resolve_users(batch)
+        serializer = TaskImportSerializer(data=batch, many=True)
+        valid = serializer.is_valid()
+        row_errors = serializer.errors if not valid else [{}] * len(batch)
+
+        owners = []
+        for number, (row, errors) in enumerate(
+            zip(batch, row_errors), start=offset + 1
+        ):
+            owner = self.user or self.users.get(row.get("username"))
+            if owner is None:
+                errors = {**errors, "username": ["Unknown user."]}
+            if errors:
+                self.report_error(number, errors)
+            owners.append(owner)
+
+        if not valid or None in owners:
+            return []
+        return [
+            Task(user=owner, **data)
+            for owner, data in zip(owners, serializer.validated_data)
+        ]
+
+    def assign_priorities(self, tasks):
+        user_ids = {task.user_id for task in tasks} - set(self.next_priority)
+        if user_ids:
+            # Users without pending tasks start from the first priority
+            self.next_priority.update(dict.fromkeys(user_ids, 1))
+            self.next_priority.update(
+                Task.objects.filter(
+                    user_id__in=user_ids, completed=False, deleted=False
+                )
+                .values("user_id")
+                .annotate(last=Max("priority") + 1)
+                .values_list("user_id", "last")
+            )
+            EmailPreferences.objects.bulk_create(
+                [EmailPreferences(user_id=user_id) for user_id in user_ids],
+                ignore_conflicts=True,
+            )
+
+        for task in tasks:
+            if not task.completed:
+                task.priority = self.next_priority[task.user_id]
+                self.next_priority[task.user_id] += 1
+
+    def load(self, tasks):
+        self.assign_priorities(tasks)
+        now = timezone.now()
+        for task in tasks:
+            task.created_date = task.created_at = now
+
+        # COPY skips signals just like bulk_create: a new task has no history yet
+        if connection.vendor == "postgresql":
+            copy_tasks(tasks)
+        else:
+            Task.objects.bulk_create(tasks, batch_size=1000)
+        bump_user_version(*(task.user_id for task in tasks))
+        self.imported += len(tasks)
@@ -0,0 +1,41 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.tasks.exports import EXPORT_FIELDS, EXPORT_FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = "Streams tasks or task history as CSV/NDJSON with flat memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument("resource", choices=list(EXPORT_FIELDS))
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument(
+            "--user", help="Username to export; every user's rows by default."
+        )
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "-o", "--output", help="File to write to; standard output by default."
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        chunks = export_chunks(
+            options["resource"], options["format"], user, options["gzip"]
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,43 @@
+import csv
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.tasks.imports import TaskImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-loads tasks from a CSV or NDJSON file. Rows name their owner in a "
+        "username column unless --user is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+        parser.add_argument("--user", help="Username owning every imported task.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        with open(options["path"], newline="", encoding="utf-8") as source:
+            if options["format"] == "csv":
+                rows = csv.DictReader(source)
+            else:
+                rows = (json.loads(line) for line in source if line.strip())
+            importer = TaskImporter(user, options["batch_size"]).run(rows)
+
+        if importer.invalid_rows:
+            for error in importer.errors:
+                self.stderr.write(f"Row {error['row']}: {error['errors']}")
+            raise CommandError(
+                f"{importer.invalid_rows} invalid row(s), nothing was imported"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Imported {importer.imported} tasks"))
@@ -0,0 +1,105 @@
+"""Prometheus metrics of the web and worker processes.
+
+Under gunicorn or the Celery prefork pool every process keeps its own values.
+Setting ``PROMETHEUS_MULTIPROC_DIR`` to a directory shared by the processes of a
+host, emptied before they start, makes each of them write its samples there and
+``/metrics`` aggregate them all (see config/gunicorn.py). The web and Celery
+processes each get their own directory in the Procfile, so that a restart of
+one does not empty the directory of the other.
+"""
+import os
+import time
+
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_init
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    # Samples are written from the first metric created, the directory must exist
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving a request, by URL name.",
+    ["view", "method"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by requests, by URL name.",
+    ["view"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Run time of Celery tasks.", ["task"]
+)
+CELERY_TASK_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between publishing a Celery task and a worker starting it.",
+    ["task"],
+)
+EMAILS_SENT = Counter("task_report_emails_sent", "Task report emails sent.")
+EMAIL_FAILURES = Counter(
+    "task_report_email_failures", "Task report emails that could not be sent."
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Reads of the two-tier cache, by the tier that answered or miss.",
+    ["result"],
+)
+
+# Message header carrying the publish time, read back by the worker
+PUBLISHED_AT_HEADER = "published_at"
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    # Unmatched paths share one label so scanners cannot blow up the cardinality
+    return match.view_name if match is not None else "<unresolved>"
+
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    headers[PUBLISHED_AT_HEADER] = time.time()
+
+
+@task_prerun.connect
+def start_task_timer(task=None, **kwargs):
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is not None:
+        CELERY_TASK_QUEUE_WAIT.labels(task.name).observe(time.time() - published_at)
+    task.request.metrics_started_at = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task=None, **kwargs):
+    started_at = getattr(task.request, "metrics_started_at", None)
+    if started_at is not None:
+        CELERY_TASK_DURATION.labels(task.name).observe(time.perf_counter() - started_at)
+
+
+@worker_init.connect
+def serve_worker_metrics(**kwargs):
+    # Workers have no web server of their own to be scraped through
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=get_registry())
@@ -1,17 +1,303 @@
+import cProfile
+import logging
+import marshal
+import random
+import time
+from contextlib import ExitStack
 from datetime import datetime
 
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.urls import Resolver404, resolve
+from django.utils.functional import SimpleLazyObject
+
+from task_manager.tasks.authentication import get_cached_user
+from task_manager.tasks.metrics import REQUEST_LATENCY, REQUEST_QUERIES, view_name
+from task_manager.tasks.models import ProfilingConfig, RequestProfile
+from task_manager.tasks.routers import pin_to_primary, read_database, replica_reads
+from task_manager.tasks.transactions import read_only
+
+logger = logging.getLogger(__name__)
+
+# Requests that must not change anything, their reads may go to a replica
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Staff members send this header to have their request profiled
+PROFILE_HEADER = "HTTP_X_PROFILE"
+# How long each process keeps using the admin-configured sample rate
+PROFILING_CONFIG_REFRESH_SECONDS = 30
+
+
+def resolve_view(request):
+    """The view ``request`` goes to, None if no URL matches, for middleware
+    that needs it before the handler resolves the URL itself.
+    """
+    if request.resolver_match is None:
+        try:
+            request.resolver_match = resolve(
+                request.path_info, getattr(request, "urlconf", None)
+            )
+        except Resolver404:
+            return None
+    return request.resolver_match.func
+
+
+class QueryCounter:
+    """``execute_wrapper`` hook counting the queries run."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryTimer(QueryCounter):
+    """QueryCounter also adding up the time spent in the queries."""
+
+    def __init__(self):
+        super().__init__()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestProfilingMiddleware:
+    """Records the latency and query count of every request in the metrics.
+
+    Requests sampled by ``REQUEST_PROFILING_SAMPLE_RATE`` also have their
+    database time measured: the measurements are sent back in a
+    ``Server-Timing`` header and requests slower than
+    ``SLOW_REQUEST_THRESHOLD_MS`` are logged with their numbers.
+    """
 
-class CustomMiddleware(object):
     def __init__(self, get_response):
-        # One time configuration and initialisation of the object (with get_response)
-        # get_response is the next middleware inline to be executed
         self.get_response = get_response
+        self.sample_rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        self.slow_threshold = settings.SLOW_REQUEST_THRESHOLD_MS / 1000
 
     def __call__(self, request):
-        # Executed for each request before the view and later middleware are called
-
-        # print("Middleware request: ", request)
         # Can now access current_time in templates
         request.current_time = datetime.now()
+        sampled = self.sample_rate and random.random() < self.sample_rate
+        timer = QueryTimer() if sampled else QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        view = view_name(request)
+        REQUEST_LATENCY.labels(view, request.method).observe(total)
+        REQUEST_QUERIES.labels(view).observe(timer.count)
+        if not sampled:
+            return response
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"',
+                f"app;dur={(total - timer.duration) * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        if total >= self.slow_threshold:
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "user_id": getattr(getattr(request, "user", None), "pk", None),
+                "total_ms": round(total * 1000, 1),
+                "db_ms": round(timer.duration * 1000, 1),
+                "queries": timer.count,
+            }
+            logger.warning(
+                "Slow request %(method)s %(path)s: %(total_ms)sms, "
+                "%(queries)s queries in %(db_ms)sms",
+                record,
+                extra={"request_profile": record},
+            )
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """Captures a cProfile of requests asking for it and of a sampled share of all.
+
+    A request is profiled when a staff member sends ``X-Profile: 1`` or when it
+    falls in the sample configured on ProfilingConfig in the admin. Captures are
+    saved as RequestProfile rows, downloadable from the admin, and their id is
+    returned in an ``X-Profile-Id`` header. It sits after AuthenticationMiddleware
+    so the header can be checked against the session user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = None
+        self.config_expires = 0.0
+
+    def get_config(self):
+        now = time.monotonic()
+        if now >= self.config_expires:
+            # Not a read of the request, which must not pick its replica
+            self.config = (
+                ProfilingConfig.objects.using(DEFAULT_DB_ALIAS).order_by("pk").first()
+            )
+            self.config_expires = now + PROFILING_CONFIG_REFRESH_SECONDS
+        return self.config
+
+    def should_profile(self, request):
+        if request.META.get(PROFILE_HEADER) == "1" and request.user.is_staff:
+            return True
+        config = self.get_config()
+        return (
+            config is not None
+            and config.sample_rate > 0
+            and request.path.startswith(config.path_prefix)
+            and random.random() < config.sample_rate
+        )
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        profiler.create_stats()
+        try:
+            profile = RequestProfile.objects.create(
+                method=request.method,
+                path=request.path,
+                user=request.user if request.user.is_authenticated else None,
+                status_code=response.status_code,
+                duration_ms=duration * 1000,
+                data=marshal.dumps(profiler.stats),
+            )
+        except Exception:
+            # Losing a profile must never fail the request it was taken from
+            logger.exception("Could not save the profile of %s", request.path)
+        else:
+            response["X-Profile-Id"] = str(profile.pk)
+        return response
+
+
+class SessionSaveSkipMiddleware(SessionMiddleware):
+    """SessionMiddleware that does not write back sessions whose data is unchanged.
+
+    Only sessions from ``task_manager.tasks.sessions`` know what they loaded,
+    others are saved as usual.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, "session", None)
+        is_unchanged = getattr(session, "is_unchanged", None)
+        if session is not None and session.modified and is_unchanged is not None:
+            session.modified = not is_unchanged()
+        return super().process_response(request, response)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware loading ``request.user`` from the user cache,
+    see ``task_manager.tasks.authentication.get_cached_user``.
+    """
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: self.get_user(request))
+
+    @staticmethod
+    def get_user(request):
+        if not hasattr(request, "_cached_user"):
+            request._cached_user = get_cached_user(request)
+        return request._cached_user
+
+
+class ReplicaRoutingMiddleware:
+    """Reads of safe-method requests, and of views marked ``read_only_requests``
+    whatever their method, may go to a replica, see ``task_manager.tasks.routers``.
+    Users who sent any other request are pinned to the primary for a while.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_only_view = getattr(resolve_view(request), "read_only_requests", None)
+        if request.method in SAFE_METHODS or read_only_view is not None:
+            with replica_reads(request):
+                return self.get_response(request)
+
         response = self.get_response(request)
+        # API views set the user they authenticated on the request
+        if request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
         return response
+
+
+class TransactionPolicyMiddleware:
+    """Runs each view in the transaction its request needs, see
+    ``task_manager.tasks.transactions``.
+
+    Views of safe-method requests run in autocommit, so reads hold no
+    transaction open, and those of other requests in one atomic block. The
+    block wraps the handler, which still calls the view, the process_exception
+    of other middleware and its own checks. As with ATOMIC_REQUESTS, it is
+    rolled back when the view raised, even if some middleware then turned the
+    exception into a response, and when DRF did. It must be the last
+    middleware, so that its process_exception runs before any other and its
+    block holds no other middleware. Turning ATOMIC_REQUESTS back on disables
+    it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        using, block = self.transaction(request, resolve_view(request))
+        # For process_exception
+        request.transaction_policy_using = using
+        if block is None:
+            return self.get_response(request)
+        with block:
+            response = self.get_response(request)
+            if getattr(response, "exception", False):
+                transaction.set_rollback(True, using=using)
+        return response
+
+    def process_exception(self, request, exception):
+        using = getattr(request, "transaction_policy_using", None)
+        if using is not None:
+            transaction.set_rollback(True, using=using)
+        return None
+
+    @staticmethod
+    def transaction(request, view):
+        """The database and block the view of ``request`` runs in, if any."""
+        if view is None:
+            return None, None
+        if connections[DEFAULT_DB_ALIAS].settings_dict["ATOMIC_REQUESTS"]:
+            return None, None
+        if DEFAULT_DB_ALIAS in getattr(view, "_non_atomic_requests", ()):
+            return None, None
+
+        options = getattr(view, "read_only_requests", None)
+        if options is not None:
+            # On the replica the reads go to, if any
+            using = read_database()
+            return using, read_only(using=using, **options)
+        if request.method in SAFE_METHODS:
+            return None, None
+        return DEFAULT_DB_ALIAS, transaction.atomic()
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.12 on 2026-10-19 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_emailpreferences'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskhistory',
+            index=models.Index(fields=['task', 'updated_at'], name='tasks_history_task_updated'),
+        ),
+    ]
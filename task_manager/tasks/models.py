@@ -1,7 +1,13 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, transaction
+from django.db.models import Q, sql
+from django.utils import timezone
 
 from django.contrib.auth.models import User
 
+from task_manager.tasks.cache import bump_user_version
+from task_manager.tasks.events import publish_event
+
 STATUS_CHOICES = (
     ("PENDING", "PENDING"),
     ("IN_PROGRESS", "IN_PROGRESS"),
@@ -10,17 +16,170 @@ STATUS_CHOICES = (
 )
 
 
+def supports_update_returning(connection):
+    # Django 3.2 only uses RETURNING on inserts
+    if connection.vendor == "postgresql":
+        return True
+    return (
+        connection.vendor == "sqlite"
+        and connection.Database.sqlite_version_info >= (3, 35)
+    )
+
+
+class TaskQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """Marks the tasks deleted, their rows and history are purged later in
+        the background.
+
+        Returns how many tasks changed, tasks already deleted are left alone.
+        Where the database supports it, a single UPDATE ... RETURNING also
+        tells whose tasks they were.
+        """
+        changes = {"deleted": True, "deleted_at": timezone.now()}
+        pending = self.filter(deleted=False)
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db, savepoint=False):
+            if supports_update_returning(connection):
+                # The UPDATE update() runs, see UpdateQuery and SQLUpdateCompiler
+                query = pending.query.chain(sql.UpdateQuery)
+                query.add_update_values(changes)
+                compiler = query.get_compiler(self.db)
+                compiler.pre_sql_setup()
+                update, params = compiler.as_sql()
+                quote = connection.ops.quote_name
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"{update} RETURNING {quote('id')}, {quote('user_id')}",
+                        params,
+                    )
+                    deleted = cursor.fetchall()
+            else:
+                deleted = list(pending.select_for_update().values_list("id", "user_id"))
+                Task.all_objects.filter(
+                    id__in=[task_id for task_id, _ in deleted]
+                ).update(**changes)
+
+            # update() sends no signals, see complete()
+            bump_user_version(*(user_id for _, user_id in deleted))
+            for task_id, user_id in deleted:
+                publish_event(
+                    user_id, {"type": "task.deleted", "task": {"id": task_id}}
+                )
+        return len(deleted)
+
+    def complete(self):
+        """Marks the tasks completed and records their history in bulk.
+
+        Three statements, however many tasks there are: a SELECT ... FOR UPDATE
+        locks the tasks to change and reads their previous status, one UPDATE
+        completes them and one INSERT writes their history rows.
+
+        Returns how many tasks changed. Both ``completed`` and ``status`` are set,
+        tasks that already have both are left alone.
+        """
+        with transaction.atomic():
+            previous = list(
+                self.filter(Q(completed=False) | ~Q(status="COMPLETED"))
+                .select_for_update()
+                .values_list("id", "user_id", "status")
+            )
+            if not previous:
+                return 0
+
+            # created_date is auto_now, keep bumping it like save() did
+            Task.all_objects.filter(
+                id__in=[task_id for task_id, _, _ in previous]
+            ).update(completed=True, status="COMPLETED", created_date=timezone.now())
+            history = TaskHistory.objects.bulk_create(
+                [
+                    TaskHistory(
+                        task_id=task_id,
+                        previous_status=status,
+                        current_status="COMPLETED",
+                    )
+                    for task_id, _, status in previous
+                    if status != "COMPLETED"
+                ]
+            )
+
+            # Neither update() nor bulk_create() send the signals feeding the
+            # stream and dropping cached counts
+            bump_user_version(*(user_id for _, user_id, _ in previous))
+            for task_id, user_id, _ in previous:
+                publish_event(
+                    user_id,
+                    {
+                        "type": "task.updated",
+                        "task": {
+                            "id": task_id,
+                            "completed": True,
+                            "status": "COMPLETED",
+                        },
+                    },
+                )
+            user_ids = {task_id: user_id for task_id, user_id, _ in previous}
+            for entry in history:
+                publish_event(
+                    user_ids[entry.task_id],
+                    {
+                        "type": "history.created",
+                        "task_id": entry.task_id,
+                        "previous_status": entry.previous_status,
+                        "current_status": entry.current_status,
+                        "updated_at": entry.updated_at,
+                    },
+                )
+        return len(previous)
+
+
+class TaskManager(models.Manager.from_queryset(TaskQuerySet)):
+    """Hides soft-deleted tasks, ``Task.all_objects`` still sees them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted=False)
+
+
 class Task(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
     completed = models.BooleanField(default=False)
     created_date = models.DateTimeField(auto_now=True)
+    # created_date moves on every save, this does not; unknown for tasks
+    # created before it was added
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
     deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    priority = models.PositiveIntegerField(default=1)
+    status = models.CharField(
+        max_length=100, choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0]
+    )
+
+    objects = TaskManager()
+    all_objects = TaskQuerySet.as_manager()
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedTask(models.Model):
+    """Old completed tasks moved out of the hot tasks table, with their history.
+
+    Rows keep the id they had as a Task and are written by ``archive_completed_tasks``.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=100)
+    description = models.TextField()
+    completed = models.BooleanField(default=True)
+    created_date = models.DateTimeField()
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     priority = models.PositiveIntegerField(default=1)
     status = models.CharField(
         max_length=100, choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0]
     )
+    history = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title
@@ -36,6 +195,14 @@ class TaskHistory(models.Model):
     )
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves history lookups for one or many tasks ordered/ranged by time
+            models.Index(
+                fields=["task", "updated_at"], name="tasks_history_task_updated"
+            ),
+        ]
+
     def __str__(self):
         return str(self.task)
 
@@ -47,3 +214,65 @@ class EmailPreferences(models.Model):
 
     def __str__(self):
         return str(self.user)
+
+
+class TaskDailyStats(models.Model):
+    """Per user, day and status rollup of TaskHistory, see ``refresh_task_stats``.
+
+    ``entered`` counts transitions into the status on that day, ``exited`` and
+    ``seconds_in_status`` describe the stretches in that status that ended on it.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    status = models.CharField(max_length=100, choices=STATUS_CHOICES)
+    entered = models.PositiveIntegerField(default=0)
+    exited = models.PositiveIntegerField(default=0)
+    seconds_in_status = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "day", "status"], name="tasks_daily_stats_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.day} {self.status}"
+
+
+class TaskStatsWatermark(models.Model):
+    """Single row remembering the last TaskHistory id folded into the rollup."""
+
+    last_history_id = models.BigIntegerField(default=0)
+
+
+class ProfilingConfig(models.Model):
+    """Single row with the admin-configured share of requests to profile."""
+
+    sample_rate = models.FloatField(
+        default=0, help_text="Share of requests profiled, between 0 and 1."
+    )
+    path_prefix = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Only sample requests whose path starts with this.",
+    )
+
+    def __str__(self):
+        return f"{self.sample_rate:g} of {self.path_prefix or 'all requests'}"
+
+
+class RequestProfile(models.Model):
+    """cProfile capture of one request, in the marshal format read by pstats."""
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f}ms)"
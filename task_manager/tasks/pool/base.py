@@ -0,0 +1,204 @@
+"""
+PostgreSQL backend taking its connections from a bounded per-process pool.
+
+    DATABASES["default"]["ENGINE"] = "task_manager.tasks.pool"
+    DATABASES["default"]["OPTIONS"]["pool"] = {"max_size": 10, ...}
+
+Django closes the connection at the end of every request and Celery task when
+CONN_MAX_AGE is 0, this backend then hands it back to the pool instead. Pool
+options, all optional:
+
+    max_size      connections opened by a process at most
+    timeout       seconds to wait for a connection once max_size are in use
+    max_lifetime  seconds after which a connection is replaced
+    ping_after    seconds a connection may sit idle before it is checked with
+                  a ``SELECT 1`` when handed out
+"""
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from django.db.backends.postgresql import base, creation
+from psycopg2 import Error as DatabaseError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+POOL_DEFAULTS = {
+    "max_size": 10,
+    "timeout": 10.0,
+    "max_lifetime": 1800,
+    "ping_after": 5.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(base.Database.OperationalError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, max_size, timeout, max_lifetime, ping_after):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        # Connections created before a fork belong to the parent process
+        self.pid = os.getpid()
+        self.size = 0
+        # (connection, returned at), most recently returned last
+        self.idle = deque()
+        self.opened_at = {}
+        self.condition = threading.Condition()
+
+    def getconn(self, connect):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s, "
+                            f"all {self.max_size} are in use"
+                        )
+                    self.condition.wait(remaining)
+                if self.idle:
+                    connection, returned_at = self.idle.pop()
+                else:
+                    connection, returned_at = None, None
+                    self.size += 1
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self._forget(None)
+                    raise
+                self.opened_at[id(connection)] = time.monotonic()
+                return connection
+            if self._healthy(connection, returned_at):
+                return connection
+            self._discard(connection)
+
+    def putconn(self, connection, check=False):
+        """Returns ``connection`` to the pool, rolling back what it left open.
+
+        With ``check``, for connections that raised errors, it is pinged
+        first and closed instead if it no longer answers.
+        """
+        if os.getpid() != self.pid:
+            return
+        broken = connection.closed or self._expired(connection)
+        if not broken:
+            status = connection.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                broken = True
+            elif status != TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except DatabaseError:
+                    broken = True
+        if not broken and check:
+            broken = not self._ping(connection)
+        if broken:
+            self._discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def _healthy(self, connection, returned_at):
+        if connection.closed or self._expired(connection):
+            return False
+        return time.monotonic() - returned_at < self.ping_after or self._ping(
+            connection
+        )
+
+    def _ping(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            return False
+        return True
+
+    def _expired(self, connection):
+        opened_at = self.opened_at.get(id(connection), 0)
+        return time.monotonic() - opened_at > self.max_lifetime
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except DatabaseError:
+            pass
+        self._forget(connection)
+
+    def _forget(self, connection):
+        if connection is not None:
+            self.opened_at.pop(id(connection), None)
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+
+def get_pool(conn_params, options):
+    key = (os.getpid(), tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**{**POOL_DEFAULTS, **options})
+        return _pools[key]
+
+
+def close_pools(database):
+    """Closes the idle connections pooled by this process to ``database``."""
+    with _pools_lock:
+        pools = [
+            pool
+            for (pid, params), pool in _pools.items()
+            if pid == os.getpid() and dict(params)["database"] == database
+        ]
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database from being dropped
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    pool = None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(conn_params, self.settings_dict["OPTIONS"].get("pool", {}))
+        connection = self.pool.getconn(partial(super().get_new_connection, conn_params))
+        # What the parent sets on new connections, pooled ones need it too
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # Connections that raised errors are only kept if they still answer
+            self.pool.putconn(self.connection, check=self.errors_occurred)
@@ -0,0 +1,116 @@
+"""
+Sends reads to the replicas in DATABASE_REPLICAS where a little lag is harmless.
+
+Reads only go to a replica inside ``replica_reads()``, which
+``ReplicaRoutingMiddleware`` enters for safe-method requests and views marked
+``read_only_requests``, and Celery enters for tasks declared with
+``@app.task(read_replica=True)``. All the reads of one request or task go to
+the same replica. Users who wrote something, with their session or an API
+token, are pinned to the primary for REPLICA_PIN_SECONDS, so they read their
+own writes. Writes and migrations always go to the primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import AuthenticationFailed
+
+from task_manager.tasks.authentication import CachedTokenAuthentication
+
+# Credentials and sessions must be usable as soon as they are written
+PRIMARY_APPS = {"auth", "authtoken", "sessions"}
+
+_replica_reads = ContextVar("replica_reads", default=None)
+
+
+def pin_key(user_id):
+    return f"db-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaReads:
+    def __init__(self, request=None):
+        self.request = request
+        self.alias = None
+
+    def user_id(self):
+        user = getattr(self.request, "user", None)
+        if user is None:
+            return None
+        if user.is_authenticated:
+            return user.pk
+        # DRF only authenticates API tokens in the view, after the first reads
+        try:
+            credentials = CachedTokenAuthentication().authenticate(self.request)
+        except AuthenticationFailed:
+            return None
+        return None if credentials is None else credentials[0].pk
+
+    def is_pinned(self):
+        user_id = self.user_id()
+        return user_id is not None and cache.get(pin_key(user_id), False)
+
+    def get_alias(self):
+        # Chosen on the first read that may go to a replica, then kept so that
+        # every read sees the same database
+        if self.alias is None:
+            if not settings.DATABASE_REPLICAS or self.is_pinned():
+                self.alias = DEFAULT_DB_ALIAS
+            else:
+                self.alias = random.choice(settings.DATABASE_REPLICAS)
+        return self.alias
+
+
+@contextmanager
+def replica_reads(request=None):
+    """Lets reads go to a replica, unless the user of ``request`` is pinned."""
+    token = _replica_reads.set(ReplicaReads(request))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_database():
+    """The alias reads go to at this point, for transactions that must cover them."""
+    reads = _replica_reads.get()
+    return DEFAULT_DB_ALIAS if reads is None else reads.get_alias()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = _replica_reads.get()
+        if reads is None or model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return reads.get_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary
+        return db == DEFAULT_DB_ALIAS
+
+
+@task_prerun.connect
+def start_replica_reads(task=None, **kwargs):
+    if getattr(task, "read_replica", False):
+        task.request.replica_reads_token = _replica_reads.set(ReplicaReads())
+
+
+@task_postrun.connect
+def stop_replica_reads(task=None, **kwargs):
+    token = getattr(task.request, "replica_reads_token", None)
+    if token is not None:
+        _replica_reads.reset(token)
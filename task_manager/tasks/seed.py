@@ -0,0 +1,198 @@
+import csv
+import io
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from task_manager.tasks.imports import COPY_COLUMNS, batched
+from task_manager.tasks.models import (
+    STATUS_CHOICES,
+    EmailPreferences,
+    Task,
+    TaskHistory,
+)
+
+USER_COLUMNS = (
+    "password",
+    "is_superuser",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_staff",
+    "is_active",
+    "date_joined",
+)
+# Tasks per user follow a Pareto distribution, lower means heavier heavy users
+PARETO_ALPHA = 1.2
+# Seeded tasks are spread over this many days before now
+SEED_DAYS = 90
+# Rows per INSERT where COPY is not available
+INSERT_BATCH_SIZE = 5000
+
+
+class RowStream(io.TextIOBase):
+    """File-like CSV view of ``rows`` that COPY reads without it being built up."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = io.StringIO()
+        # Quoted, as COPY reads unquoted empty strings as NULL
+        self.writer = csv.writer(self.buffer, quoting=csv.QUOTE_NONNUMERIC)
+        self.pending = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            chunk = list(islice(self.rows, 1000))
+            if not chunk:
+                break
+            self.writer.writerows(chunk)
+            self.pending += self.buffer.getvalue()
+            self.buffer.seek(0)
+            self.buffer.truncate()
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+def copy_rows(table, columns, rows):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                RowStream(rows),
+            )
+            return
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+        for batch in batched(rows, INSERT_BATCH_SIZE):
+            cursor.executemany(sql, batch)
+
+
+def insert_select(model, columns, queryset):
+    # Derived rows are computed by the database instead of travelling through Python
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} ({', '.join(columns)}) {sql}", params
+        )
+        return cursor.rowcount
+
+
+def user_rows(prefix, count, password):
+    now = timezone.now()
+    for number in range(count):
+        username = f"{prefix}{number}"
+        yield (
+            password,
+            False,
+            username,
+            "",
+            "",
+            f"{username}@example.com",
+            False,
+            True,
+            now,
+        )
+
+
+def task_rows(user_ids, tasks_per_user, rng):
+    now = timezone.now()
+    statuses = [status for status, _ in STATUS_CHOICES]
+    # Pareto variates with a minimum of 1 average alpha / (alpha - 1)
+    scale = tasks_per_user * (PARETO_ALPHA - 1) / PARETO_ALPHA
+    for user_id in user_ids:
+        pending_priority = 0
+        for number in range(max(1, int(rng.paretovariate(PARETO_ALPHA) * scale))):
+            status = rng.choice(statuses)
+            completed = status == "COMPLETED"
+            if completed:
+                priority = number + 1
+            else:
+                pending_priority += 1
+                priority = pending_priority
+            created_date = now - timedelta(seconds=rng.randrange(SEED_DAYS * 86400))
+            row = {
+                "title": f"Seeded task {number}",
+                "description": "Generated by seed_tasks",
+                "completed": completed,
+                "created_date": created_date,
+                "created_at": created_date,
+                "deleted": False,
+                "user_id": user_id,
+                "priority": priority,
+                "status": status,
+            }
+            yield [row[column] for column in COPY_COLUMNS]
+
+
+def seed(users, tasks_per_user=20, prefix="seed", password=None, random_seed=0):
+    """Creates ``users`` users named ``<prefix><n>`` with tasks, history and
+    email preferences, bypassing the model signals.
+
+    Users and tasks are streamed with COPY on PostgreSQL. Every seeded task
+    that left PENDING gets the history row its transition would have written,
+    and every seeded user gets email preferences, both with one INSERT ... SELECT.
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(random_seed)
+    # Hashing once keeps a usable password affordable for millions of users
+    password_hash = make_password(password)
+    seeded_users = User.objects.filter(username__startswith=prefix)
+    seeded_tasks = Task.all_objects.filter(user__username__startswith=prefix)
+
+    with transaction.atomic():
+        copy_rows(
+            User._meta.db_table,
+            USER_COLUMNS,
+            user_rows(prefix, users, password_hash),
+        )
+        # Fetched up front, the connection is busy while COPY pulls the rows
+        user_ids = list(seeded_users.order_by("id").values_list("id", flat=True))
+        copy_rows(
+            Task._meta.db_table,
+            COPY_COLUMNS,
+            task_rows(user_ids, tasks_per_user, rng),
+        )
+        # The SQL selects model fields before annotations, whatever the
+        # values_list() order, so the columns are listed in that order
+        history = insert_select(
+            TaskHistory,
+            ("task_id", "current_status", "updated_at", "previous_status"),
+            seeded_tasks.exclude(status="PENDING")
+            .annotate(previous_status=Value("PENDING"))
+            .values_list("id", "status", "created_date", "previous_status"),
+        )
+        preferences = insert_select(
+            EmailPreferences,
+            ("user_id", "selected_email_hour", "previous_report_day"),
+            seeded_users.annotate(
+                hour=Mod("id", 24), previous_report_day=Value(0)
+            ).values_list("id", "hour", "previous_report_day"),
+        )
+
+    if connection.vendor == "postgresql":
+        # Fresh planner statistics, the tables may have grown by orders of magnitude
+        with connection.cursor() as cursor:
+            for model in (User, Task, TaskHistory, EmailPreferences):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    return {
+        "users": users,
+        "tasks": seeded_tasks.count(),
+        "history": history,
+        "email_preferences": preferences,
+    }
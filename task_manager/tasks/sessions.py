@@ -0,0 +1,28 @@
+import copy
+
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    """cached_db session store that remembers what it loaded.
+
+    Reads come from the cache and only fall through to django_session on a
+    miss. ``is_unchanged`` lets SessionSaveSkipMiddleware drop saves of
+    sessions that were marked modified but hold the same data under the same key.
+    """
+
+    loaded_key = None
+    loaded_data = None
+
+    def load(self):
+        data = super().load()
+        self.loaded_key = self.session_key
+        self.loaded_data = copy.deepcopy(data)
+        return data
+
+    def is_unchanged(self):
+        return (
+            self.loaded_data is not None
+            and self.session_key == self.loaded_key
+            and self._session == self.loaded_data
+        )
@@ -1,13 +1,22 @@
-from django.db.models.signals import pre_save, post_save
+from django.core.cache import cache
+from django.db.models.signals import pre_save, post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+from task_manager.tasks.authentication import (
+    forget_user,
+    forget_user_tokens,
+    token_cache_key,
+)
+from task_manager.tasks.cache import bump_user_version
+from task_manager.tasks.events import publish_event
 from task_manager.tasks.models import Task, TaskHistory, EmailPreferences
 
 
 @receiver(pre_save, sender=Task)
 def update_task_history(sender, instance, **kwargs):
     if instance.id:
-        old_task = Task.objects.get(id=instance.id)
+        old_task = Task.all_objects.get(id=instance.id)
         new_task = instance
 
         if old_task.status != new_task.status:
@@ -22,3 +31,63 @@ def update_task_history(sender, instance, **kwargs):
 def create_email_preference(sender, instance, created, **kwargs):
     if created:
         EmailPreferences.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def forget_cached_tokens(sender, instance, **kwargs):
+    # A deactivated or otherwise changed user must not be served from the cache
+    forget_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Saving covers password changes, whose sessions must then fail verification
+    forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def forget_cached_token(sender, instance, **kwargs):
+    cache.delete(token_cache_key(instance.key))
+
+
+def task_event_payload(task):
+    return {
+        "id": task.id,
+        "title": task.title,
+        "completed": task.completed,
+        "deleted": task.deleted,
+        "priority": task.priority,
+        "status": task.status,
+    }
+
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, **kwargs):
+    publish_event(
+        instance.user_id,
+        {
+            "type": "task.created" if created else "task.updated",
+            "task": task_event_payload(instance),
+        },
+    )
+
+
+@receiver(post_save, sender=Task)
+def forget_cached_task_data(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=TaskHistory)
+def publish_history_created(sender, instance, created, **kwargs):
+    if created:
+        publish_event(
+            instance.task.user_id,
+            {
+                "type": "history.created",
+                "task_id": instance.task_id,
+                "previous_status": instance.previous_status,
+                "current_status": instance.current_status,
+                "updated_at": instance.updated_at,
+            },
+        )
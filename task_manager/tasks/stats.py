@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from task_manager.tasks.cache import user_key
+from task_manager.tasks.models import (
+    Task,
+    TaskDailyStats,
+    TaskHistory,
+    TaskStatsWatermark,
+)
+
+# Responses are cheap to rebuild, this only absorbs dashboards refreshing in a loop
+STATS_CACHE_SECONDS = 60
+
+
+def fold_history_into_rollup(batch_size=10000):
+    """Adds the next ``batch_size`` unprocessed TaskHistory rows to TaskDailyStats.
+
+    Ids are handed out before their transaction commits, so a row can become
+    visible after rows with higher ids. The watermark therefore stops short of
+    the first row younger than TASK_STATS_LAG_SECONDS, which assumes no
+    transaction writing history lasts that long. The first stretch of a task
+    is timed from its ``created_at``, and left out for tasks without one.
+    Returns how many history rows were folded in.
+    """
+    with transaction.atomic():
+        # Also serialises concurrent runs of the job
+        watermark, _ = TaskStatsWatermark.objects.select_for_update().get_or_create(
+            pk=1
+        )
+        pending = TaskHistory.objects.filter(id__gt=watermark.last_history_id)
+        lag_start = timezone.now() - timedelta(seconds=settings.TASK_STATS_LAG_SECONDS)
+        first_recent = (
+            pending.filter(updated_at__gt=lag_start)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if first_recent is not None:
+            pending = pending.filter(id__lt=first_recent)
+        new_rows = list(
+            pending.order_by("id").values_list("id", "task_id")[:batch_size]
+        )
+        if not new_rows:
+            return 0
+        last_id = new_rows[-1][0]
+
+        # The time spent in the previous status needs the preceding transition,
+        # which may belong to an earlier batch
+        history = (
+            TaskHistory.objects.filter(
+                task_id__in={task_id for _, task_id in new_rows}, id__lte=last_id
+            )
+            .annotate(
+                previous_at=Window(
+                    Lag("updated_at"),
+                    partition_by=[F("task_id")],
+                    order_by=[F("updated_at").asc(), F("id").asc()],
+                )
+            )
+            .values_list(
+                "id",
+                "task__user_id",
+                "previous_status",
+                "current_status",
+                "updated_at",
+                "previous_at",
+                "task__created_at",
+            )
+        )
+
+        deltas = defaultdict(lambda: {"entered": 0, "exited": 0, "seconds": 0.0})
+        for (
+            history_id,
+            user_id,
+            previous,
+            current,
+            at,
+            previous_at,
+            created_at,
+        ) in history:
+            if history_id <= watermark.last_history_id or user_id is None:
+                continue
+            # The first transition ends the stretch the task was created in
+            if previous_at is None:
+                previous_at = created_at
+            day = timezone.localdate(at)
+            deltas[(user_id, day, current)]["entered"] += 1
+            if previous_at is not None:
+                delta = deltas[(user_id, day, previous)]
+                delta["exited"] += 1
+                delta["seconds"] += (at - previous_at).total_seconds()
+
+        existing = {
+            (stats.user_id, stats.day, stats.status): stats
+            for stats in TaskDailyStats.objects.filter(
+                user_id__in={user_id for user_id, _, _ in deltas},
+                day__in={day for _, day, _ in deltas},
+            )
+        }
+        created = []
+        for key, delta in deltas.items():
+            stats = existing.get(key)
+            if stats is None:
+                user_id, day, status = key
+                stats = TaskDailyStats(user_id=user_id, day=day, status=status)
+                created.append(stats)
+            stats.entered += delta["entered"]
+            stats.exited += delta["exited"]
+            stats.seconds_in_status += delta["seconds"]
+        TaskDailyStats.objects.bulk_update(
+            existing.values(), ["entered", "exited", "seconds_in_status"]
+        )
+        TaskDailyStats.objects.bulk_create(created)
+
+        watermark.last_history_id = last_id
+        watermark.save(update_fields=["last_history_id"])
+        return len(new_rows)
+
+
+def task_stats(user, days):
+    # Status counts are current, the rollup trails behind anyway
+    cache_key = user_key(user.pk, f"task-stats:{days}")
+    stats = cache.get(cache_key)
+    if stats is not None:
+        return stats
+
+    rollup = TaskDailyStats.objects.filter(
+        user=user, day__gt=timezone.localdate() - timedelta(days=days)
+    )
+    stats = {
+        "status_counts": dict(
+            Task.objects.filter(user=user, deleted=False)
+            .values_list("status")
+            .annotate(Count("id"))
+            .order_by()
+        ),
+        "completions_per_day": [
+            {"day": day, "completed": entered}
+            for day, entered in rollup.filter(status="COMPLETED", entered__gt=0)
+            .order_by("day")
+            .values_list("day", "entered")
+        ],
+        "average_seconds_in_status": {
+            status: seconds / exited
+            for status, exited, seconds in rollup.values("status")
+            .annotate(exited=Sum("exited"), seconds=Sum("seconds_in_status"))
+            .order_by()
+            .values_list("status", "exited", "seconds")
+            if exited
+        },
+    }
+    cache.set(cache_key, stats, STATS_CACHE_SECONDS)
+    return stats
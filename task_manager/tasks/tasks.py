@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
 from django.core.mail import send_mail
-from .models import EmailPreferences, Task, STATUS_CHOICES
-from datetime import datetime
+from django.db import transaction
+from django.utils import timezone
+from .cache import bump_user_version
+from .metrics import EMAIL_FAILURES, EMAILS_SENT
+from .models import ArchivedTask, EmailPreferences, Task, TaskHistory, STATUS_CHOICES
+from .stats import fold_history_into_rollup
+from collections import defaultdict
+from datetime import datetime, timedelta
 
 from celery.schedules import crontab
 
@@ -11,9 +19,18 @@ from config.celery_app import app
 def setup_periodic_tasks(sender, **kwargs):
     # Setup an hourly job to check all users' email preferences and send out reports for those due
     sender.add_periodic_task(crontab(hour="*", minute=0), check_email_preferences.s())
+    # Keep the analytics rollup at most a few minutes behind TaskHistory
+    sender.add_periodic_task(crontab(minute="*/5"), refresh_task_stats.s())
+    # Soft-deleted tasks are removed for good once a night
+    sender.add_periodic_task(crontab(hour=3, minute=30), purge_deleted_tasks.s())
+    # Move old completed tasks out of the hot tasks table
+    sender.add_periodic_task(crontab(hour=4, minute=0), archive_completed_tasks.s())
+    # Expired sessions are never read again, drop their rows
+    sender.add_periodic_task(crontab(hour=4, minute=30), clear_expired_sessions.s())
 
 
-@app.task
+# Reports tolerate replica lag, previous_report_day is written to the primary
+@app.task(read_replica=True)
 def check_email_preferences():
     current_date = datetime.now().day
     current_hour = datetime.now().hour
@@ -28,6 +45,103 @@ def check_email_preferences():
         email_preference.save()
 
 
+@app.task
+def refresh_task_stats(batch_size=10000):
+    # Bounded batches keep every transaction short however far behind we are
+    while fold_history_into_rollup(batch_size) == batch_size:
+        pass
+
+
+@app.task
+def purge_deleted_tasks():
+    deleted_before = timezone.now() - timedelta(days=settings.TASK_PURGE_AFTER_DAYS)
+    batch_size = settings.TASK_PURGE_BATCH_SIZE
+
+    while True:
+        task_ids = list(
+            Task.all_objects.filter(deleted=True, deleted_at__lt=deleted_before)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not task_ids:
+            break
+
+        # History can be much larger than the tasks, so it goes in slices too
+        while True:
+            history_ids = list(
+                TaskHistory.objects.filter(task_id__in=task_ids).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
+            if not history_ids:
+                break
+            with transaction.atomic():
+                TaskHistory.objects.filter(id__in=history_ids).delete()
+
+        with transaction.atomic():
+            Task.all_objects.filter(id__in=task_ids).delete()
+
+
+@app.task
+def archive_completed_tasks():
+    # created_date is bumped on every save, so this is really "untouched for"
+    archive_before = timezone.now() - timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+
+    while True:
+        with transaction.atomic():
+            tasks = list(
+                Task.objects.filter(completed=True, created_date__lt=archive_before)
+                .select_for_update(skip_locked=True)
+                .order_by("id")[: settings.TASK_ARCHIVE_BATCH_SIZE]
+            )
+            if not tasks:
+                break
+            task_ids = [task.id for task in tasks]
+
+            history = defaultdict(list)
+            for entry in (
+                TaskHistory.objects.filter(task_id__in=task_ids)
+                .order_by("updated_at", "id")
+                .values("task_id", "previous_status", "current_status", "updated_at")
+            ):
+                history[entry.pop("task_id")].append(entry)
+
+            ArchivedTask.objects.bulk_create(
+                [
+                    ArchivedTask(
+                        id=task.id,
+                        title=task.title,
+                        description=task.description,
+                        completed=task.completed,
+                        created_date=task.created_date,
+                        user_id=task.user_id,
+                        priority=task.priority,
+                        status=task.status,
+                        history=history[task.id],
+                    )
+                    for task in tasks
+                ]
+            )
+            TaskHistory.objects.filter(task_id__in=task_ids).delete()
+            Task.all_objects.filter(id__in=task_ids).delete()
+            bump_user_version(*(task.user_id for task in tasks))
+
+
+@app.task
+def clear_expired_sessions():
+    # Unlike clearsessions, each DELETE only locks a bounded number of rows
+    batch_size = settings.SESSION_CLEANUP_BATCH_SIZE
+    while True:
+        session_keys = list(
+            Session.objects.filter(expire_date__lt=timezone.now()).values_list(
+                "session_key", flat=True
+            )[:batch_size]
+        )
+        if not session_keys:
+            break
+        Session.objects.filter(session_key__in=session_keys).delete()
+
+
 def send_email_reminder(user):
     print(f"Starting to send email to user {user}")
 
@@ -39,11 +153,16 @@ def send_email_reminder(user):
         ).count()
         email_content += f"{status_choice[0]} tasks: {tasks_count}\n"
 
-    send_mail(
-        "Daily Report from Task Manager",
-        email_content,
-        "tasks@task_manager.org",
-        [user.email],
-    )
+    try:
+        send_mail(
+            "Daily Report from Task Manager",
+            email_content,
+            "tasks@task_manager.org",
+            [user.email],
+        )
+    except Exception:
+        EMAIL_FAILURES.inc()
+        raise
+    EMAILS_SENT.inc()
 
     print(f"Email sent to user {user}")
@@ -0,0 +1,16 @@
+from factory import Faker, Sequence, SubFactory
+from factory.django import DjangoModelFactory
+
+from task_manager.tasks.models import Task
+from task_manager.users.tests.factories import UserFactory
+
+
+class TaskFactory(DjangoModelFactory):
+
+    title = Faker("sentence", nb_words=4)
+    description = Faker("paragraph")
+    user = SubFactory(UserFactory)
+    priority = Sequence(lambda n: n + 1)
+
+    class Meta:
+        model = Task
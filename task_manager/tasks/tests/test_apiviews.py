@@ -0,0 +1,224 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from task_manager.tasks.models import ArchivedTask, ProfilingConfig, Task, TaskHistory
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def select_queries(context: CaptureQueriesContext):
+    # Write requests add savepoint statements around their view and the
+    # profiler middleware looks up its sample rate on a client's first request
+    return [
+        q["sql"]
+        for q in context.captured_queries
+        if q["sql"].startswith("SELECT")
+        and ProfilingConfig._meta.db_table not in q["sql"]
+    ]
+
+
+@pytest.fixture
+def api_client(user: User) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestSparseFieldsets:
+    def test_default_returns_every_field(self, api_client: APIClient, user: User):
+        TaskFactory(user=user)
+
+        response = api_client.get("/api/task/")
+
+        assert response.status_code == 200
+        assert set(response.data[0]) == {
+            "id",
+            "title",
+            "description",
+            "completed",
+            "status",
+            "priority",
+            "user",
+        }
+
+    def test_fields_narrow_output_and_columns(self, api_client: APIClient, user: User):
+        TaskFactory.create_batch(3, user=user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get("/api/task/?fields=id,title")
+
+        assert [set(task) for task in response.data] == [{"id", "title"}] * 3
+        [query] = select_queries(context)
+        assert "description" not in query
+
+    def test_expand_user_is_joined(self, api_client: APIClient, user: User):
+        TaskFactory.create_batch(3, user=user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get("/api/task/?fields=id&expand=user")
+
+        assert len(select_queries(context)) == 1
+        assert response.data[0]["user"]["username"] == user.username
+        assert set(response.data[0]) == {"id", "user"}
+
+    def test_unknown_field_is_rejected(self, api_client: APIClient):
+        response = api_client.get("/taskapi/?fields=id,secret")
+
+        assert response.status_code == 400
+
+
+class TestCompleteActions:
+    def test_complete(self, api_client: APIClient, user: User):
+        task = TaskFactory(user=user)
+
+        response = api_client.post(f"/api/task/{task.id}/complete/")
+        assert response.data == {"completed": 1}
+        response = api_client.post(f"/api/task/{task.id}/complete/")
+        assert response.data == {"completed": 0}
+
+        task.refresh_from_db()
+        assert (task.completed, task.status) == (True, "COMPLETED")
+        assert TaskHistory.objects.filter(task=task).count() == 1
+
+    def test_complete_someone_elses_task(self, api_client: APIClient):
+        response = api_client.post(f"/api/task/{TaskFactory().id}/complete/")
+
+        assert response.status_code == 404
+
+    def test_bulk_complete(self, api_client: APIClient, user: User):
+        tasks = TaskFactory.create_batch(3, user=user)
+        someone_elses = TaskFactory()
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(
+                "/api/task/complete/",
+                {"ids": [task.id for task in tasks] + [someone_elses.id]},
+                format="json",
+            )
+
+        assert response.data == {"completed": 3}
+        updates = [q for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+        assert len(updates) == 1
+        assert Task.objects.filter(completed=True, status="COMPLETED").count() == 3
+        assert TaskHistory.objects.count() == 3
+
+
+class TestArchivedTasks:
+    def test_include_archived(self, api_client: APIClient, user: User):
+        task = TaskFactory(user=user, status="COMPLETED")
+        ArchivedTask.objects.create(
+            id=task.id + 1,
+            user=user,
+            title="archived",
+            description="",
+            status="COMPLETED",
+            created_date=task.created_date,
+        )
+
+        response = api_client.get("/api/task/?fields=id")
+        assert response.data == [{"id": task.id}]
+
+        response = api_client.get(
+            "/api/task/?fields=id,title&status=COMPLETED&include_archived=true"
+        )
+        assert [row["title"] for row in response.data] == [task.title, "archived"]
+
+
+class TestBatchAPIView:
+    def test_runs_sub_requests_in_order(self, api_client: APIClient, user: User):
+        task = TaskFactory(user=user)
+
+        response = api_client.post(
+            "/api/batch/",
+            {
+                "requests": [
+                    {"path": "/api/task/?fields=id,title"},
+                    {"path": f"/api/task/{task.id}/?fields=status"},
+                    {"path": f"/api/task/history/{task.id}/"},
+                    {"path": "/api/does-not-exist/"},
+                ]
+            },
+            format="json",
+        )
+
+        assert response.status_code == 200
+        statuses = [result["status"] for result in response.data["responses"]]
+        assert statuses == [200, 200, 200, 404]
+        assert response.data["responses"][0]["body"] == [
+            {"id": task.id, "title": task.title}
+        ]
+
+    def test_rejects_writes(self, api_client: APIClient):
+        response = api_client.post(
+            "/api/batch/",
+            {"requests": [{"method": "POST", "path": "/api/task/"}]},
+            format="json",
+        )
+
+        assert response.status_code == 400
+
+    def test_rejects_paths_that_cannot_be_batched(self, api_client: APIClient):
+        response = api_client.post(
+            "/api/batch/",
+            {
+                "requests": [
+                    {"path": "/tasks/"},
+                    {"path": "/api/task/export/"},
+                    {"path": "/user/logout/"},
+                    {"path": "/api/task/"},
+                ]
+            },
+            format="json",
+        )
+
+        assert response.status_code == 200
+        statuses = [result["status"] for result in response.data["responses"]]
+        assert statuses == [400, 400, 400, 200]
+
+    def test_requires_authentication(self):
+        response = APIClient().post(
+            "/api/batch/", {"requests": [{"path": "/api/task/"}]}, format="json"
+        )
+
+        assert response.status_code == 403
+
+
+class TestMultiTaskHistoryAPI:
+    def test_groups_history_of_requested_tasks(self, api_client: APIClient, user: User):
+        first, second, ignored = TaskFactory.create_batch(3, user=user)
+        someone_elses = TaskFactory()
+        for task in (first, second, ignored, someone_elses):
+            task.status = "IN_PROGRESS"
+            task.save()
+        first.status = "COMPLETED"
+        first.save()
+
+        task_ids = f"{first.id},{second.id},{someone_elses.id}"
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(f"/api/task/history/?task={task_ids}")
+
+        assert response.status_code == 200
+        assert len(select_queries(context)) == 1
+        groups = {group["task"]: group["history"] for group in response.data["results"]}
+        assert set(groups) == {first.id, second.id}
+        assert [entry["current_status"] for entry in groups[first.id]] == [
+            "COMPLETED",
+            "IN_PROGRESS",
+        ]
+
+    def test_cursor_pagination(self, api_client: APIClient, user: User):
+        task = TaskFactory(user=user)
+        for status in ("IN_PROGRESS", "COMPLETED", "PENDING"):
+            task.status = status
+            task.save()
+
+        response = api_client.get("/api/task/history/?page_size=2")
+        assert len(response.data["results"][0]["history"]) == 2
+
+        response = api_client.get(response.data["next"])
+        assert len(response.data["results"][0]["history"]) == 1
+        assert response.data["next"] is None
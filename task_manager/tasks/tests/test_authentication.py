@@ -0,0 +1,147 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from task_manager.tasks.authentication import token_cache_key, user_cache_key
+from task_manager.tasks.cache import shared_cache, user_version_key
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def token_client(user: User):
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def token_queries(context: CaptureQueriesContext):
+    table = Token._meta.db_table
+    return [q["sql"] for q in context.captured_queries if table in q["sql"]]
+
+
+def test_token_lookup_is_cached(token_client: APIClient):
+    assert token_client.get("/api/task/").status_code == 200
+
+    with CaptureQueriesContext(connection) as context:
+        response = token_client.get("/api/task/")
+
+    assert response.status_code == 200
+    assert token_queries(context) == []
+
+
+def test_cached_tokens_hold_no_credentials(token_client: APIClient, user: User):
+    token_client.get("/api/task/")
+
+    cached = shared_cache().get(token_cache_key(user.auth_token.key))
+
+    assert cached == user.pk
+    assert user.auth_token.key not in repr(cached)
+
+
+def test_deleted_token_is_rejected(token_client: APIClient, user: User):
+    token_client.get("/api/task/")
+
+    Token.objects.filter(user=user).get().delete()
+
+    response = token_client.get("/api/task/")
+    assert response.status_code == 403
+    assert response.data["detail"] == "Invalid token."
+
+
+def test_deactivated_user_is_rejected(token_client: APIClient, user: User):
+    token_client.get("/api/task/")
+
+    user.is_active = False
+    user.save()
+
+    response = token_client.get("/api/task/")
+    assert response.status_code == 403
+    assert response.data["detail"] == "User inactive or deleted."
+
+
+def user_queries(context: CaptureQueriesContext):
+    table = User._meta.db_table
+    return [q["sql"] for q in context.captured_queries if f'FROM "{table}"' in q["sql"]]
+
+
+def test_session_user_is_cached(client: Client, user: User):
+    client.force_login(user)
+    client.get("/tasks/")
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/tasks/")
+
+    assert response.status_code == 200
+    assert response.context["user"] == user
+    assert user_queries(context) == []
+
+
+def test_session_user_is_kept_in_the_local_tier(client: Client, user: User):
+    client.force_login(user)
+    client.get("/tasks/")
+    shared_cache().delete(user_cache_key(user.pk))
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/tasks/")
+
+    assert response.context["user"] == user
+    assert user_queries(context) == []
+    assert not shared_cache().has_key(user_cache_key(user.pk))
+
+
+def test_other_processes_deactivations_are_seen_once_the_local_version_expires(
+    client: Client, user: User
+):
+    client.force_login(user)
+    client.get("/tasks/")
+
+    # What saving the user does in another process
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    caches["shared"].delete(user_cache_key(user.pk))
+    caches["shared"].incr(user_version_key(user.pk))
+    assert client.get("/tasks/").status_code == 200
+
+    cache.local.delete(user_version_key(user.pk))
+    assert client.get("/tasks/").status_code == 302
+
+
+def test_password_change_logs_out_other_sessions(client: Client, user: User):
+    client.force_login(user)
+    client.get("/tasks/")
+
+    user.set_password("a new password")
+    user.save()
+
+    response = client.get("/tasks/")
+    assert response.status_code == 302
+    assert response.url.startswith("/user/login")
+
+
+def test_deactivated_session_user_is_logged_out(client: Client, user: User):
+    client.force_login(user)
+    client.get("/tasks/")
+
+    user.is_active = False
+    user.save()
+
+    assert client.get("/tasks/").status_code == 302
+
+
+def test_credentials_and_sessions_skip_the_local_tier(
+    client: Client, token_client: APIClient, user: User
+):
+    # Another process could not evict them from this one's local tier
+    client.force_login(user)
+    client.get("/tasks/")
+    token_client.get("/api/task/")
+
+    assert not cache.local.has_key(user_cache_key(user.pk))
+    assert not cache.local.has_key(token_cache_key(user.auth_token.key))
+    assert not any("session" in key for key in cache.local._cache)
@@ -0,0 +1,123 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+
+from task_manager.tasks import events
+from task_manager.tasks.cache import bump_user_version, user_key, user_version_key
+from task_manager.tasks.models import Task
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(result):
+    return REGISTRY.get_sample_value("cache_requests_total", {"result": result}) or 0
+
+
+def completed_counts(context: CaptureQueriesContext):
+    # The count only task_counts() runs, the list views count pending tasks
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith("SELECT COUNT")
+        and '"tasks_task"."completed"'
+        in query["sql"].replace('NOT "tasks_task"."completed"', "")
+    ]
+
+
+def test_reads_are_served_from_the_local_tier():
+    cache.set("answer", 42)
+    local_hits = sample("local_hit")
+
+    assert cache.get("answer") == 42
+    assert sample("local_hit") == local_hits + 1
+
+
+def test_local_tier_falls_back_to_the_shared_cache():
+    caches["shared"].set("answer", 42)
+    shared_hits = sample("shared_hit")
+
+    assert cache.get("answer") == 42
+    assert cache.local.get("answer") == 42
+    assert sample("shared_hit") == shared_hits + 1
+
+
+def test_local_copies_expire_quickly():
+    cache.set("answer", 42, timeout=3600)
+    # Another process changing the value is only seen once the local copy expires
+    caches["shared"].set("answer", 43)
+    assert cache.get("answer") == 42
+
+    cache.local.delete("answer")
+    assert cache.get("answer") == 43
+
+
+def test_bumping_the_version_changes_user_keys(
+    user: User, django_capture_on_commit_callbacks
+):
+    key = user_key(user.pk, "data")
+    cache.set(key, "old")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bump_user_version(user.pk)
+
+    assert user_key(user.pk, "data") != key
+    assert cache.get(user_key(user.pk, "data")) is None
+
+
+def test_soft_delete_bumps_the_version_and_announces(
+    monkeypatch, user: User, django_capture_on_commit_callbacks
+):
+    task = TaskFactory(user=user)
+    key = user_key(user.pk, "data")
+    published = []
+
+    class Channel:
+        def publish(self, user_id, event):
+            published.append((user_id, event))
+
+    monkeypatch.setattr(events, "get_channel", Channel)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert Task.objects.filter(pk=task.pk).soft_delete() == 1
+
+    assert user_key(user.pk, "data") != key
+    assert published == [(user.pk, {"type": "task.deleted", "task": {"id": task.pk}})]
+
+
+def test_other_processes_bumps_are_seen_once_the_local_version_expires(user: User):
+    key = user_key(user.pk, "data")
+    local_hits = sample("local_hit")
+
+    # What bump_user_version() does in another process
+    caches["shared"].incr(user_version_key(user.pk))
+    assert user_key(user.pk, "data") == key
+    assert sample("local_hit") == local_hits + 1
+
+    cache.local.delete(user_version_key(user.pk))
+    assert user_key(user.pk, "data") != key
+
+
+def test_task_counts_are_cached_until_tasks_change(
+    client: Client, user: User, django_capture_on_commit_callbacks
+):
+    task = TaskFactory(user=user)
+    client.force_login(user)
+    client.get("/tasks/")
+
+    with CaptureQueriesContext(connection) as cached:
+        response = client.get("/tasks/")
+    assert response.context["total_tasks_count"] == 1
+    assert response.context["completed_tasks_count"] == 0
+    assert not completed_counts(cached)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(f"/complete_task/{task.pk}/")
+    with CaptureQueriesContext(connection) as counted:
+        response = client.get("/tasks/")
+    assert response.context["completed_tasks_count"] == 1
+    assert len(completed_counts(counted)) == 1
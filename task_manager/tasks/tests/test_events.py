@@ -0,0 +1,159 @@
+import asyncio
+import json
+import queue
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+
+from task_manager.tasks.events import (
+    EVENTS_PATH,
+    InProcessChannel,
+    RedisChannel,
+    format_event,
+    get_channel,
+    sse_application,
+)
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def in_process_channel(settings):
+    settings.TASK_EVENTS_CHANNEL = "task_manager.tasks.events.InProcessChannel"
+    get_channel.cache_clear()
+    yield
+    get_channel.cache_clear()
+
+
+def test_in_process_channel_delivers_to_user_only():
+    async def scenario():
+        channel = InProcessChannel()
+        mine = channel.subscribe(1)
+        other = channel.subscribe(2)
+        channel.publish(1, {"type": "task.updated"})
+        assert await asyncio.wait_for(mine.get(), 1) == {"type": "task.updated"}
+        assert other.queue.empty()
+        channel.unsubscribe(mine)
+        channel.unsubscribe(other)
+        assert channel._subscriptions == {}
+
+    asyncio.run(scenario())
+
+
+class FakeRedis:
+    """Hands the messages put in ``messages`` to every pubsub listening."""
+
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.pubsubs = []
+
+    def pubsub(self, **kwargs):
+        self.pubsubs.append(self)
+        return self
+
+    def psubscribe(self, pattern):
+        self.pattern = pattern
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+    def close(self):
+        pass
+
+
+def test_redis_channel_shares_one_reader(settings):
+    settings.TASK_EVENTS_REDIS_URL = "redis://localhost:6379/0"
+
+    async def scenario():
+        channel = RedisChannel()
+        channel._client = redis = FakeRedis()
+        streams = [channel.subscribe(1), channel.subscribe(1), channel.subscribe(2)]
+        redis.messages.put(
+            {
+                "channel": RedisChannel.channel_name(1).encode(),
+                "data": json.dumps({"type": "task.updated"}).encode(),
+            }
+        )
+        for stream in streams[:2]:
+            assert await asyncio.wait_for(stream.get(), 1) == {"type": "task.updated"}
+        assert streams[2].queue.empty()
+        assert len(redis.pubsubs) == 1
+        assert redis.pattern == RedisChannel.channel_name("*")
+        for stream in streams:
+            channel.unsubscribe(stream)
+
+    asyncio.run(scenario())
+
+
+def test_lifespan_handshake():
+    from config.asgi import application
+
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(application({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_format_event():
+    assert format_event({"type": "task.deleted", "task": {"id": 3}}) == (
+        b'event: task.deleted\ndata: {"type": "task.deleted", "task": {"id": 3}}\n\n'
+    )
+
+
+def test_stream_rejects_anonymous_requests():
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": EVENTS_PATH, "headers": []}
+    asyncio.run(sse_application(scope, receive, send))
+    assert sent[0]["status"] == 401
+
+
+def test_stream_pushes_task_changes(user: User):
+    token = Token.objects.create(user=user)
+    scope = {
+        "type": "http",
+        "path": EVENTS_PATH,
+        "headers": [(b"authorization", f"Token {token.key}".encode())],
+    }
+
+    async def scenario():
+        sent = []
+        disconnected = asyncio.Event()
+        streaming = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            streaming.set()
+            if b"task.created" in message.get("body", b""):
+                disconnected.set()
+
+        stream = asyncio.ensure_future(sse_application(scope, receive, send))
+        await streaming.wait()
+        await sync_to_async(TaskFactory)(user=user)
+        await asyncio.wait_for(stream, 5)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent[0]["status"] == 200
+    assert b"event: task.created" in sent[-1]["body"]
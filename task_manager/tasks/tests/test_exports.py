@@ -0,0 +1,97 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from task_manager.tasks.exports import export_chunks
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_csv_export_of_a_user(user: User):
+    task = TaskFactory(user=user)
+    TaskFactory()
+
+    lines = b"".join(export_chunks("tasks", "csv", user)).decode().splitlines()
+
+    assert lines[0].startswith("id,user_id,title,")
+    assert len(lines) == 2
+    assert lines[1].startswith(f"{task.id},{user.id},")
+
+
+def test_gzipped_ndjson_history_export(user: User):
+    task = TaskFactory(user=user)
+    task.status = "COMPLETED"
+    task.save()
+
+    body = gzip.decompress(b"".join(export_chunks("history", "ndjson", compress=True)))
+
+    [row] = [json.loads(line) for line in body.splitlines()]
+    assert row["task_id"] == task.id
+    assert row["current_status"] == "COMPLETED"
+
+
+def test_export_endpoint_streams(user: User):
+    TaskFactory.create_batch(2, user=user)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/task/export/?output=ndjson")
+
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert len(b"".join(response.streaming_content).splitlines()) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_endpoint_streams_under_asgi(user: User):
+    from config.asgi import application
+
+    TaskFactory.create_batch(2, user=user)
+    token = Token.objects.create(user=user)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/task/export/",
+        "query_string": b"output=ndjson",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", f"Token {token.key}".encode()),
+        ],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    # Queries in the event loop would raise SynchronousOnlyOperation
+    asyncio.run(application(scope, receive, send))
+
+    assert sent[0]["status"] == 200
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert len(body.splitlines()) == 2
+
+
+def test_full_export_is_staff_only(user: User):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    assert client.get("/api/task/export/?all_users=true").status_code == 403
+
+
+def test_export_command(user: User, tmp_path):
+    TaskFactory.create_batch(3, user=user)
+    output = tmp_path / "tasks.csv"
+
+    call_command("export_tasks", "tasks", "--user", user.username, "-o", str(output))
+
+    assert len(output.read_text().splitlines()) == 4
@@ -0,0 +1,85 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from rest_framework.test import APIClient
+
+from task_manager.tasks.imports import TaskImporter
+from task_manager.tasks.models import EmailPreferences, Task
+from task_manager.tasks.tests.factories import TaskFactory
+from task_manager.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_pending_tasks_are_appended_without_cascading(user: User):
+    existing = TaskFactory(user=user, priority=4)
+    rows = [
+        {"title": "first import", "description": "a", "priority": 1},
+        {"title": "done import", "description": "b", "priority": 2, "completed": True},
+        {"title": "second import", "description": "c", "priority": 1},
+    ]
+
+    importer = TaskImporter(user, batch_size=2).run(rows)
+
+    assert importer.imported == 3
+    existing.refresh_from_db()
+    assert existing.priority == 4
+    priorities = dict(Task.objects.values_list("title", "priority"))
+    assert priorities["first import"] == 5
+    assert priorities["done import"] == 2
+    assert priorities["second import"] == 6
+
+
+def test_invalid_rows_roll_back_everything(user: User):
+    rows = [
+        {"title": "fine", "description": "a"},
+        {"title": "no description"},
+        {"title": "wrong status", "description": "c", "status": "SOMEDAY"},
+    ]
+
+    importer = TaskImporter(user, batch_size=1).run(rows)
+
+    assert importer.invalid_rows == 2
+    assert [error["row"] for error in importer.errors] == [2, 3]
+    assert not Task.objects.exists()
+
+
+def test_rows_are_assigned_by_username():
+    owner = UserFactory()
+    EmailPreferences.objects.filter(user=owner).delete()
+    rows = [
+        {"username": owner.username, "title": "theirs", "description": "a"},
+        {"username": "nobody", "title": "orphan", "description": "b"},
+    ]
+
+    assert TaskImporter().run(rows).invalid_rows == 1
+    assert TaskImporter().run(rows[:1]).imported == 1
+    assert Task.objects.get().user == owner
+    assert EmailPreferences.objects.filter(user=owner).exists()
+
+
+def test_import_endpoint_accepts_csv(user: User):
+    client = APIClient()
+    client.force_authenticate(user)
+    upload = SimpleUploadedFile(
+        "tasks.csv", b"title,description\nfrom csv,imported\n", "text/csv"
+    )
+
+    response = client.post("/api/task/import/", {"file": upload})
+
+    assert response.status_code == 201
+    assert response.data == {"imported": 1}
+    assert Task.objects.get().user == user
+
+
+def test_import_command(user: User, tmp_path):
+    source = tmp_path / "tasks.ndjson"
+    source.write_text(
+        f'{{"username": "{user.username}", "title": "a", "description": "b"}}\n'
+        '{"username": "nobody", "title": "c", "description": "d"}\n'
+    )
+
+    with pytest.raises(CommandError):
+        call_command("import_tasks", str(source), "--format", "ndjson")
+    assert not Task.objects.exists()
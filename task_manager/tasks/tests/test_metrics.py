@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from celery.signals import task_postrun, task_prerun
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import Client
+from prometheus_client import REGISTRY
+
+from task_manager.tasks.tasks import check_email_preferences, send_email_reminder
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_metrics(settings, client: Client, user: User):
+    # Recorded for every request, not only the sampled ones
+    settings.REQUEST_PROFILING_SAMPLE_RATE = 0
+    settings.METRICS_AUTH_TOKEN = ""
+    client.force_login(user)
+    view = "task_manager.tasks.views.GenericAllTaskView"
+    before = sample("http_request_duration_seconds_count", view=view, method="GET")
+    queries_before = sample("http_request_db_queries_sum", view=view)
+
+    client.get("/all_tasks/")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert b"http_request_duration_seconds_bucket" in response.content
+    assert b"http_request_db_queries_bucket" in response.content
+    assert (
+        sample("http_request_duration_seconds_count", view=view, method="GET")
+        == before + 1
+    )
+    assert sample("http_request_db_queries_sum", view=view) > queries_before
+
+
+def test_metrics_token(settings, client: Client):
+    settings.METRICS_AUTH_TOKEN = "secret"
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+    assert response.status_code == 200
+
+
+def test_celery_task_duration():
+    before = sample(
+        "celery_task_duration_seconds_count",
+        task="task_manager.tasks.tasks.check_email_preferences",
+    )
+
+    # What the worker does around a task, without needing a result backend
+    check_email_preferences.push_request(id="test", published_at=time.time())
+    task_prerun.send(
+        check_email_preferences, task_id="test", task=check_email_preferences
+    )
+    check_email_preferences()
+    task_postrun.send(
+        check_email_preferences, task_id="test", task=check_email_preferences
+    )
+    check_email_preferences.pop_request()
+
+    assert (
+        sample(
+            "celery_task_duration_seconds_count",
+            task="task_manager.tasks.tasks.check_email_preferences",
+        )
+        == before + 1
+    )
+    assert sample(
+        "celery_task_queue_wait_seconds_count",
+        task="task_manager.tasks.tasks.check_email_preferences",
+    )
+
+
+def test_email_counters(settings, user: User):
+    sent = sample("task_report_emails_sent_total")
+    failed = sample("task_report_email_failures_total")
+
+    send_email_reminder(user)
+    settings.EMAIL_BACKEND = "django.core.mail.backends.base.BaseEmailBackend"
+    with pytest.raises(NotImplementedError):
+        send_email_reminder(user)
+
+    assert len(mail.outbox) == 1
+    assert sample("task_report_emails_sent_total") == sent + 1
+    assert sample("task_report_email_failures_total") == failed + 1
@@ -0,0 +1,220 @@
+import logging
+import marshal
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import ResolverMatch, include, path
+
+from task_manager.tasks.middleware import (
+    RequestProfilingMiddleware,
+    SamplingProfilerMiddleware,
+    TransactionPolicyMiddleware,
+)
+from task_manager.tasks.models import ProfilingConfig, RequestProfile, Task
+from task_manager.tasks.tests.factories import TaskFactory
+from task_manager.tasks.transactions import read_only_requests
+
+pytestmark = pytest.mark.django_db
+
+
+def count_tasks(request):
+    return HttpResponse(str(Task.objects.count() + Task.objects.count()))
+
+
+def atomic_depth_view():
+    # A new function every time, the transaction decorators mark the view itself
+    def atomic_depth(request):
+        # Tests run inside a transaction of their own, so nested blocks are counted
+        return HttpResponse(str(len(connection.savepoint_ids)))
+
+    return atomic_depth
+
+
+def failing_view(request):
+    TaskFactory()
+    raise ValueError("Failed")
+
+
+def no_response_view(request):
+    TaskFactory()
+
+
+urlpatterns = [
+    path("fail/", failing_view),
+    path("no-response/", no_response_view),
+    # For the error pages
+    path("", include("config.urls")),
+]
+
+
+class HandleExceptionsMiddleware:
+    """Answers for views that raised, like the debug toolbar."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        return HttpResponse(str(exception), status=503)
+
+
+class TestRequestProfilingMiddleware:
+    def test_server_timing(self, settings, rf: RequestFactory):
+        settings.REQUEST_PROFILING_SAMPLE_RATE = 1.0
+
+        response = RequestProfilingMiddleware(count_tasks)(rf.get("/"))
+
+        timings = {
+            metric.split(";", 1)[0]: metric
+            for metric in response["Server-Timing"].split(", ")
+        }
+        assert set(timings) == {"db", "app", "total"}
+        assert 'desc="2 queries"' in timings["db"]
+
+    def test_unsampled_requests_are_untouched(self, settings, rf: RequestFactory):
+        settings.REQUEST_PROFILING_SAMPLE_RATE = 0
+
+        response = RequestProfilingMiddleware(count_tasks)(rf.get("/"))
+
+        assert not response.has_header("Server-Timing")
+
+    def test_logs_slow_requests(self, settings, rf: RequestFactory, user: User, caplog):
+        settings.REQUEST_PROFILING_SAMPLE_RATE = 1.0
+        settings.SLOW_REQUEST_THRESHOLD_MS = 0
+        request = rf.get("/all_tasks/")
+        request.user = user
+
+        with caplog.at_level(logging.WARNING):
+            RequestProfilingMiddleware(count_tasks)(request)
+
+        (record,) = caplog.records
+        assert record.request_profile["path"] == "/all_tasks/"
+        assert record.request_profile["user_id"] == user.pk
+        assert record.request_profile["queries"] == 2
+
+
+class TestSamplingProfilerMiddleware:
+    def test_staff_header(self, rf: RequestFactory, user: User):
+        user.is_staff = True
+        request = rf.get("/all_tasks/", HTTP_X_PROFILE="1")
+        request.user = user
+
+        response = SamplingProfilerMiddleware(count_tasks)(request)
+
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        assert (profile.path, profile.user, profile.status_code) == (
+            "/all_tasks/",
+            user,
+            200,
+        )
+        stats = marshal.loads(bytes(profile.data))
+        assert any(function == "count_tasks" for _, _, function in stats)
+
+    def test_header_is_ignored_for_other_users(self, rf: RequestFactory, user: User):
+        request = rf.get("/all_tasks/", HTTP_X_PROFILE="1")
+        request.user = user
+
+        response = SamplingProfilerMiddleware(count_tasks)(request)
+
+        assert not response.has_header("X-Profile-Id")
+        assert not RequestProfile.objects.exists()
+
+    def test_sample_rate(self, rf: RequestFactory, user: User):
+        ProfilingConfig.objects.create(sample_rate=1, path_prefix="/all_tasks/")
+        middleware = SamplingProfilerMiddleware(count_tasks)
+
+        for path in ("/all_tasks/", "/tasks/"):
+            request = rf.get(path)
+            request.user = user
+            middleware(request)
+
+        assert list(RequestProfile.objects.values_list("path", flat=True)) == [
+            "/all_tasks/"
+        ]
+
+    def test_admin_download(self, admin_client: Client, rf: RequestFactory):
+        request = rf.get("/all_tasks/")
+        request.user = User.objects.get(username="admin")
+        ProfilingConfig.objects.create(sample_rate=1)
+        SamplingProfilerMiddleware(count_tasks)(request)
+        profile = RequestProfile.objects.get()
+
+        response = admin_client.get(
+            f"/admin/tasks/requestprofile/{profile.pk}/download/"
+        )
+
+        assert response.status_code == 200
+        assert response.content == bytes(profile.data)
+
+
+class TestTransactionPolicyMiddleware:
+    def run(self, request, view):
+        # What the handler would resolve the URL to
+        request.resolver_match = ResolverMatch(view, (), {})
+        response = TransactionPolicyMiddleware(view)(request)
+        return int(response.content) - len(connection.savepoint_ids)
+
+    def test_safe_methods_run_in_autocommit(self, rf: RequestFactory):
+        assert self.run(rf.get("/"), atomic_depth_view()) == 0
+
+    def test_other_methods_run_in_a_transaction(self, rf: RequestFactory):
+        assert self.run(rf.post("/"), atomic_depth_view()) == 1
+
+    def test_views_scoping_their_own_writes(self, rf: RequestFactory):
+        view = transaction.non_atomic_requests(atomic_depth_view())
+
+        assert self.run(rf.post("/"), view) == 0
+
+    def test_read_only_views(self, rf: RequestFactory):
+        view = read_only_requests(atomic_depth_view())
+
+        assert self.run(rf.get("/"), view) == 1
+
+    def test_atomic_requests_take_precedence(self, settings, rf: RequestFactory):
+        settings.DATABASES["default"]["ATOMIC_REQUESTS"] = True
+        try:
+            assert self.run(rf.post("/"), atomic_depth_view()) == 0
+        finally:
+            settings.DATABASES["default"]["ATOMIC_REQUESTS"] = False
+
+    def test_handled_api_exceptions_roll_back(self, rf: RequestFactory, user: User):
+        def failing_view(request):
+            TaskFactory(user=user)
+            response = HttpResponse(status=400)
+            # What DRF sets on responses built from an exception
+            response.exception = True
+            return response
+
+        request = rf.post("/")
+        request.resolver_match = ResolverMatch(failing_view, (), {})
+        TransactionPolicyMiddleware(failing_view)(request)
+
+        assert not Task.objects.exists()
+
+    @pytest.mark.urls(__name__)
+    def test_exceptions_reach_other_middleware_and_roll_back(
+        self, settings, client: Client
+    ):
+        settings.MIDDLEWARE = [
+            f"{__name__}.HandleExceptionsMiddleware",
+            *settings.MIDDLEWARE,
+        ]
+
+        response = client.post("/fail/")
+
+        assert response.status_code == 503
+        assert response.content == b"Failed"
+        assert not Task.objects.exists()
+
+    @pytest.mark.urls(__name__)
+    def test_views_must_return_a_response(self, client: Client):
+        with pytest.raises(ValueError, match="didn't return an HttpResponse"):
+            client.post("/no-response/")
+
+        # Called once, and committed as with ATOMIC_REQUESTS
+        assert Task.objects.count() == 1
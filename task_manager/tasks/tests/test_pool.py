@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+from psycopg2 import OperationalError
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INERROR,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+
+from task_manager.tasks.pool.base import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.answers = True
+        self.pings = 0
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql):
+        self.pings += 1
+        if not self.answers:
+            raise OperationalError("server closed the connection unexpectedly")
+
+    def rollback(self):
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**options):
+    return ConnectionPool(
+        **{
+            "max_size": 2,
+            "timeout": 0.01,
+            "max_lifetime": 60,
+            "ping_after": 60,
+            **options,
+        }
+    )
+
+
+def test_connections_are_reused():
+    pool = make_pool()
+    connection = pool.getconn(FakeConnection)
+    pool.putconn(connection)
+
+    assert pool.getconn(FakeConnection) is connection
+    assert pool.size == 1
+
+
+def test_size_is_bounded():
+    pool = make_pool()
+    pool.getconn(FakeConnection)
+    pool.getconn(FakeConnection)
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn(FakeConnection)
+
+
+def test_idle_connections_are_pinged():
+    pool = make_pool(ping_after=0)
+    dead = pool.getconn(FakeConnection)
+    pool.putconn(dead)
+    dead.answers = False
+
+    connection = pool.getconn(FakeConnection)
+
+    assert connection is not dead
+    assert dead.closed
+    assert pool.size == 1
+
+
+def test_open_transactions_are_rolled_back():
+    pool = make_pool()
+    connection = pool.getconn(FakeConnection)
+    connection.info.transaction_status = TRANSACTION_STATUS_INERROR
+    pool.putconn(connection, check=True)
+
+    assert pool.getconn(FakeConnection) is connection
+    assert connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+
+
+def test_broken_connections_are_recycled():
+    pool = make_pool()
+    lost = pool.getconn(FakeConnection)
+    lost.info.transaction_status = TRANSACTION_STATUS_UNKNOWN
+    failed = pool.getconn(FakeConnection)
+    failed.answers = False
+
+    pool.putconn(lost)
+    pool.putconn(failed, check=True)
+
+    assert lost.closed and failed.closed
+    assert pool.size == 0
+
+
+def test_old_connections_are_replaced():
+    pool = make_pool(max_lifetime=0)
+    old = pool.getconn(FakeConnection)
+    pool.putconn(old)
+
+    assert old.closed
+    assert pool.getconn(FakeConnection) is not old
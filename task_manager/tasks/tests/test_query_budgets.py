@@ -0,0 +1,255 @@
+"""Query-count budgets for every URL of config/urls.py and the report task.
+
+Each request runs against the same seeded dataset, large enough for a query per
+row to blow the budget. A budget that is exceeded fails with the SQL that ran,
+so an N+1 shows up here instead of in production. When a change legitimately
+needs more queries, raise its budget in the same commit.
+"""
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, resolve
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from task_manager.tasks.models import ArchivedTask, EmailPreferences
+from task_manager.tasks.tasks import check_email_preferences
+from task_manager.tasks.tests.factories import TaskFactory
+from task_manager.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+PASSWORD = "budget-password"
+PENDING_TASKS = 15
+COMPLETED_TASKS = 10
+ARCHIVED_TASKS = 5
+# Included URLconfs that are not ours to budget: the admin, allauth, the
+# cookiecutter users app and its API router
+SKIPPED_INCLUDES = ("admin/", "accounts/", "users/", "api/")
+# drf-spectacular's schema views, which only serve static documentation
+SKIPPED_ROUTES = {"api/schema/", "api/docs/"}
+
+# (method, path, payload, budget); paths are formatted with the seeded dataset
+BUDGETS = [
+    ("get", "/about/", None, 0),
+    ("get", "/", None, 0),
+    ("get", "/all_tasks/", None, 4),
+    ("get", "/tasks/", None, 5),
+    ("get", "/completed_tasks/", None, 5),
+    ("get", "/completed_tasks/?archived=1", None, 5),
+    ("get", "/create-task/", None, 0),
+    (
+        "post",
+        "/create-task/",
+        {
+            "title": "Budgeted task",
+            "description": "d",
+            "priority": 1,
+            "status": "PENDING",
+        },
+        # handlePriorityCascading looks up every task it pushes down one by one
+        18,
+    ),
+    ("get", "/update-task/{task}/", None, 1),
+    (
+        "post",
+        "/update-task/{task}/",
+        {
+            "title": "Renamed task",
+            "description": "d",
+            "priority": 3,
+            "status": "PENDING",
+        },
+        18,
+    ),
+    ("get", "/detail-task/{task}/", None, 1),
+    ("get", "/delete-task/{task}/", None, 1),
+    ("post", "/delete-task/{task}/", None, 1),
+    ("get", "/complete_task/{task}/", None, 1),
+    ("post", "/complete_task/{task}/", None, 3),
+    ("get", "/user/signup/", None, 0),
+    ("get", "/user/login/", None, 1),
+    ("get", "/user/logout/", None, 2),
+    ("get", "/sessiontest/", None, 1),
+    ("get", "/taskapi/", None, 1),
+    ("get", "/api/task/history/?task={task},{completed_task}", None, 1),
+    ("get", "/api/task/history/{task}/", None, 1),
+    (
+        "post",
+        "/api/batch/",
+        {
+            "requests": [
+                {"path": "/api/task/"},
+                {"path": "/api/task/{task}/"},
+                {"path": "/api/task/stats/"},
+            ]
+        },
+        5,
+    ),
+    ("get", "/api/task/export/", None, 1),
+    ("get", "/api/task/export/?resource=history", None, 1),
+    (
+        "post",
+        "/api/task/import/",
+        [{"title": f"Imported {n}", "description": "d"} for n in range(20)],
+        3,
+    ),
+    ("get", "/api/task/stats/", None, 3),
+    ("get", "/update-email-pref/{user}", None, 1),
+    ("post", "/update-email-pref/{user}", {"selected_email_hour": 9}, 2),
+    ("get", "/metrics", None, 0),
+    ("get", "/api/task/", None, 1),
+    ("get", "/api/task/?include_archived=true", None, 2),
+    ("post", "/api/task/", {"title": "Api task", "description": "d"}, 1),
+    ("get", "/api/task/{task}/", None, 1),
+    ("patch", "/api/task/{task}/", {"status": "IN_PROGRESS"}, 5),
+    ("delete", "/api/task/{task}/", None, 2),
+    ("post", "/api/task/{task}/complete/", None, 3),
+    ("post", "/api/task/complete/", {"ids": "{pending_ids}"}, 3),
+    ("post", "/auth-token/", {"username": "{username}", "password": PASSWORD}, 2),
+]
+# One report per user with tasks, each counting every status separately
+REPORT_TASK_BUDGET = 25
+
+
+@pytest.fixture
+def dataset(user: User):
+    user.set_password(PASSWORD)
+    user.save()
+    Token.objects.create(user=user)
+
+    pending = [TaskFactory(user=user, priority=n + 1) for n in range(PENDING_TASKS)]
+    completed = TaskFactory.create_batch(COMPLETED_TASKS, user=user, completed=True)
+    for task in pending[:5] + completed:
+        for status in ("IN_PROGRESS", "COMPLETED"):
+            task.status = status
+            task.save()
+    ArchivedTask.objects.bulk_create(
+        ArchivedTask(
+            id=10_000 + n,
+            title=f"Archived {n}",
+            description="d",
+            created_date=timezone.now() - timedelta(days=200),
+            user=user,
+            priority=n + 1,
+        )
+        for n in range(ARCHIVED_TASKS)
+    )
+
+    # Other users' rows must not be touched by the views under test, creating
+    # their tasks also creates their EmailPreferences
+    for other in UserFactory.create_batch(3):
+        TaskFactory.create_batch(5, user=other)
+
+    return {
+        "user": user.pk,
+        "username": user.username,
+        "task": pending[-1].pk,
+        "completed_task": completed[0].pk,
+        "pending_ids": [task.pk for task in pending[:10]],
+    }
+
+
+@pytest.fixture
+def logged_in_client(user: User, dataset) -> Client:
+    # Logging in after the dataset, setting the password changes the session hash
+    client = Client()
+    client.force_login(user)
+    # Per-client setup, like the profiler's sample rate lookup and loading the
+    # user into the cache, is not budgeted
+    client.get("/about/")
+    return client
+
+
+def fill(value, dataset):
+    if isinstance(value, str):
+        if value.startswith("{") and value.strip("{}") in dataset:
+            return dataset[value.strip("{}")]
+        return value.format(**dataset)
+    if isinstance(value, list):
+        return [fill(item, dataset) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, dataset) for key, item in value.items()}
+    return value
+
+
+def budgeted_queries(context: CaptureQueriesContext):
+    # Request transactions turn into savepoints inside the test transaction
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if "SAVEPOINT" not in query["sql"]
+    ]
+
+
+def assert_within_budget(queries, budget, label):
+    if len(queries) > budget:
+        listing = "\n".join(f"{n}. {sql}" for n, sql in enumerate(queries, 1))
+        pytest.fail(
+            f"{label} ran {len(queries)} queries, over its budget of {budget}:\n"
+            f"{listing}",
+            pytrace=False,
+        )
+
+
+@pytest.mark.parametrize(
+    "method, path, payload, budget",
+    BUDGETS,
+    ids=[f"{method.upper()} {path}" for method, path, _, _ in BUDGETS],
+)
+def test_url_query_budget(
+    logged_in_client: Client, dataset, method, path, payload, budget
+):
+    path = fill(path, dataset)
+    request = getattr(logged_in_client, method)
+    kwargs = {}
+    if payload is not None:
+        kwargs["data"] = fill(payload, dataset)
+        if path.startswith(("/api/", "/auth-token/")):
+            kwargs["content_type"] = "application/json"
+
+    with CaptureQueriesContext(connection) as context:
+        response = request(path, **kwargs)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    # A rejected payload would be measuring the wrong code path
+    assert response.status_code < 400
+    if method == "post" and not path.startswith(("/api/", "/auth-token/")):
+        assert response.status_code == 302, "the form was not accepted"
+    assert_within_budget(budgeted_queries(context), budget, f"{method.upper()} {path}")
+
+
+def iter_routes(patterns, prefix=""):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            if not route.startswith(SKIPPED_INCLUDES):
+                yield from iter_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and route not in SKIPPED_ROUTES:
+            yield route
+
+
+def test_every_url_has_a_budget(dataset):
+    budgeted = {
+        resolve(fill(path, dataset).split("?")[0]).route for _, path, _, _ in BUDGETS
+    }
+
+    missing = set(iter_routes(get_resolver().url_patterns)) - budgeted
+
+    assert not missing, f"URLs without a query budget: {sorted(missing)}"
+
+
+def test_report_task_query_budget(dataset):
+    EmailPreferences.objects.update(selected_email_hour=0, previous_report_day=0)
+
+    with CaptureQueriesContext(connection) as context:
+        check_email_preferences()
+
+    assert_within_budget(
+        budgeted_queries(context), REPORT_TASK_BUDGET, "check_email_preferences"
+    )
@@ -0,0 +1,50 @@
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import msgpack
+import pytest
+from rest_framework.exceptions import ParseError
+
+from task_manager.tasks.renderers import (
+    MessagePackParser,
+    MessagePackRenderer,
+    ORJSONParser,
+    ORJSONRenderer,
+)
+
+
+def test_orjson_matches_drf_json_output():
+    data = {"title": "line\u2028separator", "amount": Decimal("1.5"), "items": [1]}
+
+    assert ORJSONRenderer().render(data) == (
+        b'{"title":"line\\u2028separator","amount":1.5,"items":[1]}'
+    )
+
+
+def test_orjson_renders_list_field_errors():
+    errors = {"requests": {0: {"method": ["Not a valid choice."]}}}
+
+    assert ORJSONRenderer().render(errors) == (
+        b'{"requests":{"0":{"method":["Not a valid choice."]}}}'
+    )
+
+
+def test_orjson_keeps_pretty_printing():
+    rendered = ORJSONRenderer().render({"id": 1}, "application/json; indent=4")
+
+    assert rendered == b'{\n    "id": 1\n}'
+
+
+def test_orjson_parser_rejects_invalid_json():
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b"{not json"))
+
+
+def test_msgpack_round_trip():
+    data = {"id": 1, "updated_at": datetime(2022, 3, 2, 18, 25)}
+
+    rendered = MessagePackRenderer().render(data)
+
+    assert msgpack.unpackb(rendered) == {"id": 1, "updated_at": "2022-03-02T18:25:00"}
+    assert MessagePackParser().parse(io.BytesIO(rendered))["id"] == 1
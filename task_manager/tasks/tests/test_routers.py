@@ -0,0 +1,121 @@
+import pytest
+from celery.signals import task_postrun, task_prerun
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from task_manager.tasks.models import Task
+from task_manager.tasks.routers import pin_key, replica_reads
+from task_manager.tasks.tasks import check_email_preferences
+from task_manager.tasks.tests.factories import TaskFactory
+
+# The replica only sees committed rows, like a real one
+pytestmark = pytest.mark.django_db(transaction=True, databases=["default", "replica1"])
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ["replica1"]
+
+
+def capture(alias):
+    return CaptureQueriesContext(connections[alias])
+
+
+def task_queries(context: CaptureQueriesContext):
+    table = Task._meta.db_table
+    return [q["sql"] for q in context.captured_queries if table in q["sql"]]
+
+
+def test_safe_requests_read_from_the_replica(client: Client, user: User):
+    TaskFactory(user=user)
+    client.force_login(user)
+
+    with capture("replica1") as replica, capture("default") as primary:
+        response = client.get("/api/task/")
+
+    assert len(response.data) == 1
+    assert task_queries(replica)
+    assert not task_queries(primary)
+
+
+def test_writers_read_their_own_writes(client: Client, user: User):
+    client.force_login(user)
+    client.post("/api/task/", {"title": "New", "description": "d"})
+
+    with capture("replica1") as replica, capture("default") as primary:
+        client.get("/api/task/")
+
+    assert not task_queries(replica)
+    assert task_queries(primary)
+
+
+def test_read_only_views_read_from_the_replica(client: Client, user: User):
+    TaskFactory(user=user)
+    client.force_login(user)
+
+    with capture("replica1") as replica, capture("default") as primary:
+        response = client.post(
+            "/api/batch/",
+            {"requests": [{"path": "/api/task/"}, {"path": "/api/task/"}]},
+            content_type="application/json",
+        )
+
+    assert [result["status"] for result in response.data["responses"]] == [200, 200]
+    assert len(task_queries(replica)) == 2
+    assert not task_queries(primary)
+    assert not cache.get(pin_key(user.pk))
+
+
+def test_token_writers_read_their_own_writes(user: User):
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    client.post("/api/task/", {"title": "New", "description": "d"})
+
+    with capture("replica1") as replica, capture("default") as primary:
+        listed = client.get("/api/task/")
+        batched = client.post(
+            "/api/batch/", {"requests": [{"path": "/api/task/"}]}, format="json"
+        )
+
+    assert len(listed.data) == 1
+    assert len(batched.data["responses"][0]["body"]) == 1
+    assert not task_queries(replica)
+    assert task_queries(primary)
+
+
+def test_credentials_are_read_from_the_primary(user: User):
+    with replica_reads():
+        assert User.objects.all().db == "default"
+        assert Task.objects.all().db == "replica1"
+
+
+def test_writes_go_to_the_primary():
+    with replica_reads():
+        task = TaskFactory()
+
+    assert task._state.db == "default"
+
+
+def test_designated_tasks_read_from_the_replica():
+    TaskFactory()
+
+    # What the worker does around a task, as in test_metrics
+    check_email_preferences.push_request(id="test")
+    task_prerun.send(
+        check_email_preferences, task_id="test", task=check_email_preferences
+    )
+    with capture("replica1") as replica:
+        check_email_preferences()
+    task_postrun.send(
+        check_email_preferences, task_id="test", task=check_email_preferences
+    )
+    check_email_preferences.pop_request()
+
+    assert any("tasks_emailpreferences" in q["sql"] for q in replica.captured_queries)
+    assert Task.objects.all().db == "default"
@@ -0,0 +1,45 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+
+from task_manager.tasks.models import EmailPreferences, Task, TaskHistory
+from task_manager.tasks.seed import seed
+
+pytestmark = pytest.mark.django_db
+
+
+def test_seed_creates_consistent_rows():
+    created = seed(30, tasks_per_user=5, prefix="bench", password="secret")
+
+    users = User.objects.filter(username__startswith="bench")
+    assert users.count() == created["users"] == 30
+    assert users.first().check_password("secret")
+    tasks = Task.objects.filter(user__in=users)
+    assert tasks.count() == created["tasks"] >= 30
+    assert TaskHistory.objects.count() == created["history"]
+    assert created["history"] == tasks.exclude(status="PENDING").count()
+    assert set(TaskHistory.objects.values_list("previous_status", flat=True)) == {
+        "PENDING"
+    }
+    assert EmailPreferences.objects.filter(user__in=users).count() == 30
+
+    # Pending tasks of each user are numbered from 1 without gaps
+    for user in users:
+        priorities = sorted(
+            Task.objects.filter(user=user, completed=False).values_list(
+                "priority", flat=True
+            )
+        )
+        assert priorities == list(range(1, len(priorities) + 1))
+
+
+def test_seed_is_reproducible():
+    first = seed(20, prefix="first", random_seed=7)
+    second = seed(20, prefix="second", random_seed=7)
+
+    assert first == second
+
+
+def test_command_refuses_existing_prefix(user: User):
+    with pytest.raises(CommandError):
+        call_command("seed_tasks", "--users", "1", "--prefix", user.username)
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from task_manager.tasks.middleware import SessionSaveSkipMiddleware
+from task_manager.tasks.sessions import SessionStore
+from task_manager.tasks.tasks import clear_expired_sessions
+
+pytestmark = pytest.mark.django_db
+
+
+def stored_session(**data):
+    session = SessionStore()
+    session.update(data)
+    session.create()
+    return session.session_key
+
+
+def run_view(rf: RequestFactory, session_key, view):
+    request = rf.get("/")
+    request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+    with CaptureQueriesContext(connection) as context:
+        SessionSaveSkipMiddleware(view)(request)
+    writes = [q for q in context.captured_queries if "django_session" in q["sql"]]
+    return request.session, writes
+
+
+def set_views(count):
+    def view(request):
+        request.session["views"] = count
+        return HttpResponse()
+
+    return view
+
+
+def test_unchanged_session_is_not_saved(rf: RequestFactory):
+    session_key = stored_session(views=1)
+
+    _, writes = run_view(rf, session_key, set_views(1))
+
+    assert writes == []
+
+
+def test_changed_session_is_saved(rf: RequestFactory):
+    session_key = stored_session(views=1)
+
+    _, writes = run_view(rf, session_key, set_views(2))
+
+    assert writes
+    assert SessionStore(session_key)["views"] == 2
+
+
+def test_cycled_key_is_saved(rf: RequestFactory):
+    session_key = stored_session(views=1)
+
+    def view(request):
+        request.session.cycle_key()
+        return HttpResponse()
+
+    session, _ = run_view(rf, session_key, view)
+
+    assert session.session_key != session_key
+    assert SessionStore(session.session_key)["views"] == 1
+
+
+def test_clear_expired_sessions(settings):
+    settings.SESSION_CLEANUP_BATCH_SIZE = 2
+    expired = [stored_session() for _ in range(3)]
+    kept = stored_session()
+    Session.objects.filter(session_key__in=expired).update(
+        expire_date=timezone.now() - timedelta(days=1)
+    )
+
+    clear_expired_sessions()
+
+    assert list(Session.objects.values_list("session_key", flat=True)) == [kept]
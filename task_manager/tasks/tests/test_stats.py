@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from task_manager.tasks.models import TaskDailyStats, TaskHistory
+from task_manager.tasks.stats import fold_history_into_rollup
+from task_manager.tasks.tasks import refresh_task_stats
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def no_lag(settings):
+    # Rows written by a test are committed as soon as it sees them
+    settings.TASK_STATS_LAG_SECONDS = 0
+
+
+def move(task, status, minutes_ago):
+    task.status = status
+    task.save()
+    TaskHistory.objects.filter(task=task, current_status=status).update(
+        updated_at=timezone.now() - timedelta(minutes=minutes_ago)
+    )
+
+
+def test_rollup_is_incremental(user: User):
+    task = TaskFactory(user=user)
+    move(task, "IN_PROGRESS", minutes_ago=30)
+
+    assert fold_history_into_rollup() == 1
+    move(task, "COMPLETED", minutes_ago=10)
+    assert fold_history_into_rollup() == 1
+    assert fold_history_into_rollup() == 0
+
+    in_progress = TaskDailyStats.objects.get(user=user, status="IN_PROGRESS")
+    assert (in_progress.entered, in_progress.exited) == (1, 1)
+    assert in_progress.seconds_in_status == pytest.approx(20 * 60, abs=1)
+    assert TaskDailyStats.objects.get(user=user, status="COMPLETED").entered == 1
+
+
+def test_first_stretch_is_timed_from_the_creation(user: User):
+    task = TaskFactory(user=user)
+    # auto_now_add overrides whatever the task is created with
+    task.created_at = timezone.now() - timedelta(minutes=50)
+    task.save()
+    move(task, "IN_PROGRESS", minutes_ago=30)
+
+    fold_history_into_rollup()
+
+    pending = TaskDailyStats.objects.get(user=user, status="PENDING")
+    assert pending.exited == 1
+    assert pending.seconds_in_status == pytest.approx(20 * 60, abs=1)
+
+
+def test_recent_rows_wait_for_lower_ids_to_commit(settings, user: User):
+    settings.TASK_STATS_LAG_SECONDS = 300
+    first, second = TaskFactory.create_batch(2, user=user)
+    move(first, "IN_PROGRESS", minutes_ago=30)
+    move(second, "IN_PROGRESS", minutes_ago=1)
+    # A row with a higher id that is old enough still waits for the recent one
+    move(first, "COMPLETED", minutes_ago=10)
+
+    assert fold_history_into_rollup() == 1
+
+    TaskHistory.objects.filter(task=second).update(
+        updated_at=timezone.now() - timedelta(minutes=6)
+    )
+    assert fold_history_into_rollup() == 2
+
+
+def test_refresh_task_stats_drains_in_batches(user: User):
+    for task in TaskFactory.create_batch(5, user=user):
+        move(task, "COMPLETED", minutes_ago=1)
+
+    refresh_task_stats(batch_size=2)
+
+    assert TaskDailyStats.objects.get(user=user, status="COMPLETED").entered == 5
+
+
+def test_stats_endpoint(user: User):
+    TaskFactory(user=user)
+    task = TaskFactory(user=user)
+    move(task, "IN_PROGRESS", minutes_ago=60)
+    move(task, "COMPLETED", minutes_ago=0)
+    refresh_task_stats()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get("/api/task/stats/?days=7")
+
+    assert response.status_code == 200
+    assert response.data["status_counts"] == {"PENDING": 1, "COMPLETED": 1}
+    assert response.data["completions_per_day"] == [
+        {"day": timezone.localdate(), "completed": 1}
+    ]
+    assert response.data["average_seconds_in_status"]["IN_PROGRESS"] == pytest.approx(
+        3600, abs=1
+    )
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from task_manager.tasks.models import ArchivedTask, Task, TaskHistory
+from task_manager.tasks.tasks import archive_completed_tasks, purge_deleted_tasks
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_purge_deleted_tasks(settings):
+    settings.TASK_PURGE_AFTER_DAYS = 30
+    settings.TASK_PURGE_BATCH_SIZE = 2
+    old, recent, kept = TaskFactory.create_batch(3)
+    for task in (old, recent, kept):
+        for status in ("IN_PROGRESS", "COMPLETED", "PENDING"):
+            task.status = status
+            task.save()
+    Task.objects.filter(pk=old.pk).soft_delete()
+    Task.objects.filter(pk=recent.pk).soft_delete()
+    Task.all_objects.filter(pk=old.pk).update(
+        deleted_at=timezone.now() - timedelta(days=31)
+    )
+
+    purge_deleted_tasks()
+
+    assert set(Task.all_objects.values_list("pk", flat=True)) == {recent.pk, kept.pk}
+    assert not TaskHistory.objects.filter(task_id=old.pk).exists()
+    assert TaskHistory.objects.filter(task_id=recent.pk).count() == 3
+
+
+def test_archive_completed_tasks(settings):
+    settings.TASK_ARCHIVE_AFTER_DAYS = 90
+    settings.TASK_ARCHIVE_BATCH_SIZE = 1
+    old, recent, pending = TaskFactory.create_batch(3)
+    for task in (old, recent):
+        task.status = "COMPLETED"
+        task.completed = True
+        task.save()
+    Task.objects.filter(pk__in=[old.pk, pending.pk]).update(
+        created_date=timezone.now() - timedelta(days=91)
+    )
+
+    archive_completed_tasks()
+
+    assert set(Task.objects.values_list("pk", flat=True)) == {recent.pk, pending.pk}
+    archived = ArchivedTask.objects.get()
+    assert (archived.pk, archived.title, archived.user) == (old.pk, old.title, old.user)
+    assert [entry["current_status"] for entry in archived.history] == ["COMPLETED"]
+    assert not TaskHistory.objects.filter(task_id=old.pk).exists()
@@ -0,0 +1,84 @@
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from django.utils import timezone
+
+from task_manager.tasks.models import ArchivedTask, Task, TaskHistory
+from task_manager.tasks.tests.factories import TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def logged_in_client(user: User) -> Client:
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+class TestGenericTaskDeleteView:
+    def test_soft_deletes(self, logged_in_client: Client, user: User):
+        task = TaskFactory(user=user)
+        task.status = "IN_PROGRESS"
+        task.save()
+
+        response = logged_in_client.post(f"/delete-task/{task.pk}/")
+
+        assert response.status_code == 302
+        assert not Task.objects.filter(pk=task.pk).exists()
+        deleted = Task.all_objects.get(pk=task.pk)
+        assert deleted.deleted and deleted.deleted_at is not None
+        assert TaskHistory.objects.filter(task_id=task.pk).exists()
+
+    def test_cannot_delete_someone_elses_task(self, logged_in_client: Client):
+        task = TaskFactory()
+
+        response = logged_in_client.post(f"/delete-task/{task.pk}/")
+
+        assert response.status_code == 404
+        assert Task.objects.filter(pk=task.pk).exists()
+
+
+class TestGenericCompletedTaskView:
+    def test_archived_tasks_are_opt_in(self, logged_in_client: Client, user: User):
+        TaskFactory(user=user, completed=True, priority=2, title="LIVE COMPLETED")
+        ArchivedTask.objects.create(
+            id=1000,
+            user=user,
+            title="ARCHIVED TASK",
+            description="",
+            priority=1,
+            created_date=timezone.now(),
+        )
+
+        response = logged_in_client.get("/completed_tasks/")
+        assert [task.title for task in response.context["tasks"]] == ["LIVE COMPLETED"]
+
+        response = logged_in_client.get("/completed_tasks/?archived=1")
+        assert [
+            (task["title"], task["archived"]) for task in response.context["tasks"]
+        ] == [("ARCHIVED TASK", True), ("LIVE COMPLETED", False)]
+        assert b"(archived)" in response.content
+
+
+class TestGenericMarkTaskAsCompleteView:
+    def test_completes_with_history(self, logged_in_client: Client, user: User):
+        task = TaskFactory(user=user, status="IN_PROGRESS")
+
+        response = logged_in_client.post(f"/complete_task/{task.pk}/")
+
+        assert response.status_code == 302
+        task.refresh_from_db()
+        assert (task.completed, task.status) == (True, "COMPLETED")
+        history = TaskHistory.objects.get(task=task)
+        assert (history.previous_status, history.current_status) == (
+            "IN_PROGRESS",
+            "COMPLETED",
+        )
+
+    def test_completed_task_is_not_found(self, logged_in_client: Client, user: User):
+        task = TaskFactory(user=user, completed=True)
+
+        response = logged_in_client.post(f"/complete_task/{task.pk}/")
+
+        assert response.status_code == 404
@@ -0,0 +1,44 @@
+import pytest
+from django.template import engines
+from django.template.loaders.cached import Loader
+
+from task_manager.tasks.warmup import warm_up
+
+
+@pytest.fixture
+def cached_loader(settings) -> Loader:
+    settings.TEMPLATES = [
+        {
+            **settings.TEMPLATES[0],
+            "APP_DIRS": False,
+            "OPTIONS": {
+                **settings.TEMPLATES[0]["OPTIONS"],
+                "loaders": [
+                    (
+                        "django.template.loaders.cached.Loader",
+                        [
+                            "django.template.loaders.filesystem.Loader",
+                            "django.template.loaders.app_directories.Loader",
+                        ],
+                    )
+                ],
+            },
+        }
+    ]
+    (loader,) = engines["django"].engine.template_loaders
+    return loader
+
+
+def test_templates_are_compiled_under_the_names_views_use(cached_loader: Loader):
+    done = warm_up()
+
+    assert "pending_tasks.html" in cached_loader.get_template_cache
+    assert "tasks/pending_tasks.html" in cached_loader.get_template_cache
+    assert done["templates"] == len(cached_loader.get_template_cache)
+
+
+def test_views_and_serializers(cached_loader: Loader):
+    done = warm_up()
+
+    assert done["views"] > 30
+    assert done["serializers"] >= 3
@@ -0,0 +1,51 @@
+"""
+Transaction policies of the views, applied by TransactionPolicyMiddleware in
+place of ATOMIC_REQUESTS.
+
+Requests with a safe method run in autocommit and the others in one atomic
+block, unless their view chose otherwise:
+
+- ``transaction.non_atomic_requests`` views, or those using ScopedWritesMixin,
+  open atomic blocks around their own writes and run in autocommit otherwise;
+- ``read_only_requests`` views run in a read-only transaction, for several
+  reads that must see the same data. Whatever their method, they read from a
+  replica like safe requests and do not pin their user to the primary.
+"""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+@contextmanager
+def read_only(isolation=None, using=None):
+    """Atomic block in which PostgreSQL refuses writes, at ``isolation`` if given.
+
+    Nested in another transaction, as in tests, that transaction's isolation
+    level and access mode apply.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if outermost and connection.vendor == "postgresql":
+            level = f"ISOLATION LEVEL {isolation} " if isolation else ""
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET TRANSACTION {level}READ ONLY")
+        yield
+
+
+def read_only_requests(view, isolation=None):
+    """Runs ``view`` in a read-only transaction on the database it reads from,
+    see ``read_only()``.
+    """
+    view.read_only_requests = {"isolation": isolation}
+    return view
+
+
+class ScopedWritesMixin:
+    """For class-based views wrapping their own writes in atomic blocks, so
+    that validation and rendering happen outside of any transaction.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        return transaction.non_atomic_requests(super().as_view(*args, **initkwargs))
@@ -1,7 +1,13 @@
 from itertools import chain
-from django.http import HttpResponse, HttpResponseRedirect
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.utils.crypto import constant_time_compare
 from django.utils.safestring import mark_safe
-from .models import EmailPreferences, Task
+from .cache import user_key
+from .metrics import render_metrics
+from .models import ArchivedTask, EmailPreferences, Task
+from .transactions import ScopedWritesMixin
 
 from django.views.generic.list import ListView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
@@ -12,6 +18,7 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
+from django.db.models import Value
 
 
 class AuthorizedTaskManager(LoginRequiredMixin):
@@ -22,18 +29,27 @@ class AuthorizedTaskManager(LoginRequiredMixin):
         return tasks
 
 
+def task_counts(user_id):
+    # Cached until the user's tasks change, see bump_user_version()
+    key = user_key(user_id, "task-counts")
+    counts = cache.get(key)
+    if counts is None:
+        completed = Task.objects.filter(completed=True, user_id=user_id).count()
+        pending = Task.objects.filter(
+            deleted=False, completed=False, user_id=user_id
+        ).count()
+        counts = {
+            "completed_tasks_count": completed,
+            "total_tasks_count": completed + pending,
+        }
+        cache.set(key, counts, settings.TASK_COUNTS_CACHE_SECONDS)
+    return counts
+
+
 class TaskProgressManager:
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["completed_tasks_count"] = Task.objects.filter(
-            completed=True, user=self.request.user
-        ).count()
-        context["total_tasks_count"] = (
-            context["completed_tasks_count"]
-            + Task.objects.filter(
-                deleted=False, completed=False, user=self.request.user
-            ).count()
-        )
+        context.update(task_counts(self.request.user.pk))
         return context
 
 
@@ -96,6 +112,20 @@ class GenericCompletedTaskView(LoginRequiredMixin, TaskProgressManager, ListView
         if search_term:
             tasks = tasks.filter(title__icontains=search_term)
 
+        if self.request.GET.get("archived"):
+            archived_tasks = ArchivedTask.objects.filter(user=self.request.user)
+            if search_term:
+                archived_tasks = archived_tasks.filter(title__icontains=search_term)
+
+            # One UNION query, so pagination still happens in the database
+            fields = ("id", "title", "created_date", "priority")
+            tasks = (
+                tasks.order_by()
+                .values(*fields, archived=Value(False))
+                .union(archived_tasks.values(*fields, archived=Value(True)))
+                .order_by("priority", "id")
+            )
+
         return tasks
 
 
@@ -167,11 +197,12 @@ class TaskCreateForm(ModelForm):
         self.fields["completed"].widget.attrs["class"] = "ml-2"
 
 
-class GenericTaskCreateView(LoginRequiredMixin, CreateView):
+class GenericTaskCreateView(ScopedWritesMixin, LoginRequiredMixin, CreateView):
     form_class = TaskCreateForm
     template_name = "task_create.html"
     success_url = "/tasks"
 
+    @transaction.atomic
     def form_valid(self, form):
         new_priority = form.cleaned_data["priority"]
 
@@ -185,12 +216,13 @@ class GenericTaskCreateView(LoginRequiredMixin, CreateView):
 
 
 ################################ Update a task ##########################################
-class GenericTaskUpdateView(AuthorizedTaskManager, UpdateView):
+class GenericTaskUpdateView(ScopedWritesMixin, AuthorizedTaskManager, UpdateView):
     model = Task
     form_class = TaskCreateForm
     template_name = "task_update.html"
     success_url = "/tasks"
 
+    @transaction.atomic
     def form_valid(self, form):
         existing_priority = Task.objects.get(id=self.object.id).priority
         new_priority = form.cleaned_data["priority"]
@@ -203,24 +235,33 @@ class GenericTaskUpdateView(AuthorizedTaskManager, UpdateView):
 
 
 ################################ Delete a task ##########################################
-class GenericTaskDeleteView(AuthorizedTaskManager, DeleteView):
+class GenericTaskDeleteView(ScopedWritesMixin, AuthorizedTaskManager, DeleteView):
     model = Task
     template_name = "task_delete.html"
     success_url = "/tasks"
 
+    def delete(self, request, *args, **kwargs):
+        # Soft delete, the purge_deleted_tasks job removes the rows later
+        if not self.get_queryset().filter(pk=kwargs["pk"]).soft_delete():
+            raise Http404
+        return HttpResponseRedirect(self.success_url)
+
 
 ################################ Mark task as complete ##########################################
-class GenericMarkTaskAsCompleteView(AuthorizedTaskManager, UpdateView):
+class GenericMarkTaskAsCompleteView(
+    ScopedWritesMixin, AuthorizedTaskManager, UpdateView
+):
     model = Task
     fields = []
     template_name = "task_complete.html"
     success_url = "/tasks"
 
-    def form_valid(self, form):
-        self.object = form.save()
-        self.object.completed = True
-        self.object.save()
-        return HttpResponseRedirect(self.get_success_url())
+    def post(self, request, *args, **kwargs):
+        # One conditional UPDATE instead of loading, validating and saving twice,
+        # complete() opens its own atomic block
+        if not self.get_queryset().filter(pk=kwargs["pk"]).complete():
+            raise Http404
+        return HttpResponseRedirect(self.success_url)
 
 
 ################################ Session Storage ##########################################
@@ -239,6 +280,18 @@ def session_storage_view(request):
     )
 
 
+################################ Metrics ##########################################
+def metrics_view(request):
+    # Scrapers authenticate with a bearer token rather than a session
+    token = settings.METRICS_AUTH_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
+
+
 ################################ User Sign Up ##########################################
 
 
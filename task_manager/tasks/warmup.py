@@ -0,0 +1,89 @@
+"""
+Does the work a process would otherwise leave to its first requests.
+
+``warm_up()`` compiles every template under TEMPLATES_DIR into the cached
+loader, compiles the URL patterns and builds the reverse lookup, loads the
+translations and builds the fields of the API serializers. It runs no query,
+so it is safe before gunicorn forks its workers with ``--preload``.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def warm_templates():
+    count = 0
+    root = Path(settings.TEMPLATES_DIR)
+    for engine in engines.all():
+        # Templates are cached under the name the views use, relative to
+        # whichever of DIRS finds them
+        for directory in map(Path, getattr(engine, "dirs", [])):
+            if directory != root and root not in directory.parents:
+                continue
+            for path in sorted(directory.rglob("*.html")):
+                try:
+                    engine.get_template(path.relative_to(directory).as_posix())
+                except TemplateSyntaxError:
+                    logger.warning("Could not compile %s", path, exc_info=True)
+                else:
+                    count += 1
+    return count
+
+
+def iter_views(patterns):
+    for pattern in patterns:
+        # Route patterns compile their regex on first use
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern.url_patterns)
+        else:
+            yield pattern.callback
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # Populates every included resolver as well
+    resolver.reverse_dict
+    return list(iter_views(resolver.url_patterns))
+
+
+def warm_serializers(views):
+    serializers = {
+        view.cls.serializer_class
+        for view in views
+        if getattr(getattr(view, "cls", None), "serializer_class", None)
+    }
+    for serializer_class in serializers:
+        try:
+            # Introspects the model on every instance, this also fills the
+            # caches of the model's _meta
+            serializer_class().fields
+        except Exception:
+            logger.warning("Could not build %s", serializer_class, exc_info=True)
+    return len(serializers)
+
+
+def warm_up():
+    """Warms this process up, returns what was done for logging."""
+    start = time.perf_counter()
+    with translation.override(settings.LANGUAGE_CODE):
+        views = warm_urls()
+        done = {
+            "templates": warm_templates(),
+            "views": len(views),
+            "serializers": warm_serializers(views),
+        }
+    done["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(
+        "Warmed up in %(seconds)ss: %(templates)s templates, %(views)s views, "
+        "%(serializers)s serializers",
+        done,
+    )
+    return done